@@ -56,7 +56,7 @@ export default function Home() {
       const res = await fetch(`${backendUrl}/query`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ input: text }),
+        body: JSON.stringify({ input: text, compact: true, gzip: true }),
       });
 
       const reader = res.body!.getReader();
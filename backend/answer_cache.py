@@ -0,0 +1,232 @@
+import glob
+import logging
+import os
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from backend.config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_SIMILARITY,
+    ANSWER_CACHE_TTL_SECONDS,
+    CASES_DB_PATH,
+    DATA_CATALOG_VERSION,
+    DATA_DIR,
+)
+from backend.metrics import CACHE_LOOKUPS
+from backend.retrieval import get_retrieval_client
+from backend.scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Events that only describe resource usage of the original run; not worth replaying
+SKIP_REPLAY_EVENTS = {"usage", "budget", "queued"}
+
+# Case files sit in DATA_DIR/<kind>/year=*/court=*/bench=*/; every directory level is stat'ed
+CATALOG_LEVELS = ("*", "*/year=*", "*/year=*/court=*", "*/year=*/court=*/bench=*")
+# The partition tree is walked at most this often when DATA_CATALOG_VERSION is unset
+CATALOG_SCAN_INTERVAL = 60.0
+
+
+@dataclass
+class CacheEntry:
+    query: str
+    embedding: np.ndarray
+    catalog_version: str
+    events: list[dict]
+    answer: str
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+def catalog_version() -> str:
+    """Identify the current state of the case data, so answers never outlive a re-ingest.
+
+    Set DATA_CATALOG_VERSION when ingesting to make this exact. Otherwise the
+    partition tree is scanned, at most once a minute: adding or replacing a
+    case file changes its bench directory's mtime, which DATA_DIR's own mtime
+    does not reflect.
+    """
+    if DATA_CATALOG_VERSION:
+        return DATA_CATALOG_VERSION
+
+    global _catalog_scan
+    now = time.monotonic()
+    if _catalog_scan is None or now - _catalog_scan[0] > CATALOG_SCAN_INTERVAL:
+        _catalog_scan = (now, _scan_catalog())
+    return _catalog_scan[1]
+
+
+_catalog_scan: tuple[float, str] | None = None
+
+
+def _scan_catalog() -> str:
+    # Only directories are listed down to the bench level, never the case files in them
+    directories = [DATA_DIR]
+    for pattern in CATALOG_LEVELS:
+        directories += glob.glob(os.path.join(glob.escape(DATA_DIR), pattern))
+
+    newest = 0
+    for path in directories:
+        try:
+            newest = max(newest, int(os.stat(path).st_mtime))
+        except OSError:
+            pass
+    try:
+        index = str(int(os.stat(CASES_DB_PATH).st_mtime))
+    except OSError:
+        index = "missing"
+    return f"{newest}-{index}"
+
+
+class AnswerCache:
+    """Serve near-duplicate queries from earlier planner runs.
+
+    Entries are keyed by the query embedding and the data catalog version, and
+    hold the full event stream so a hit replays exactly what the client saw the
+    first time. Storing an answer replaces the entries it would match, so a
+    refreshed answer is never shadowed by a stale one. Bounded by
+    ANSWER_CACHE_MAX_ENTRIES (LRU) and a TTL.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = ANSWER_CACHE_ENABLED,
+        similarity: float = ANSWER_CACHE_SIMILARITY,
+        ttl_seconds: int = ANSWER_CACHE_TTL_SECONDS,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+    ):
+        self.enabled = enabled
+        self.similarity = similarity
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self._entries: OrderedDict[int, CacheEntry] = OrderedDict()
+        self._next_key = 0
+
+    async def embed(self, text: str) -> np.ndarray:
+        def _embed(t: str) -> np.ndarray:
+            # Imported here: the embedding model pulls in chromadb, which the backend loads lazily
+            from backend.embeddings import get_embedding_function
+
+            vector = np.asarray(get_embedding_function()([t])[0], dtype=np.float32)
+            return vector / (np.linalg.norm(vector) or 1.0)
+
+        retrieval = get_retrieval_client()
+        if retrieval:
+            # Batched with other workers' embeddings in the sidecar
+            vector = np.asarray(await retrieval.embed(text), dtype=np.float32)
+            return vector / (np.linalg.norm(vector) or 1.0)
+
+        return await get_scheduler().vector.run(_embed, text)
+
+    def lookup(self, embedding: np.ndarray, version: str) -> tuple[CacheEntry, float] | None:
+        self._evict_expired()
+
+        best_key, best_score = None, self.similarity
+        for key, entry in self._entries.items():
+            if entry.catalog_version != version:
+                continue
+            score = float(np.dot(entry.embedding, embedding))
+            if score >= best_score:
+                best_key, best_score = key, score
+
+        if best_key is None:
+            self.misses += 1
+            CACHE_LOOKUPS.inc(result="miss")
+            return None
+
+        self.hits += 1
+        CACHE_LOOKUPS.inc(result="hit")
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key], best_score
+
+    def store(self, query: str, embedding: np.ndarray, version: str, events: list[dict], answer: str) -> None:
+        # The new answer supersedes any entry a lookup would match instead, e.g. after bypass_cache
+        superseded = [
+            key
+            for key, entry in self._entries.items()
+            if entry.catalog_version == version and float(np.dot(entry.embedding, embedding)) >= self.similarity
+        ]
+        for key in superseded:
+            del self._entries[key]
+
+        self._entries[self._next_key] = CacheEntry(
+            query=query,
+            embedding=embedding,
+            catalog_version=version,
+            events=events,
+            answer=answer,
+        )
+        self._next_key += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def replay(self, entry: CacheEntry, similarity: float) -> AsyncIterator[dict]:
+        yield {
+            "type": "cache_hit",
+            "cached_query": entry.query,
+            "similarity": round(similarity, 4),
+            "age_seconds": round(entry.age),
+            "catalog_version": entry.catalog_version,
+        }
+        for event in entry.events:
+            yield event
+
+    async def record(
+        self, events: AsyncIterator[dict], query: str, embedding: np.ndarray, version: str
+    ) -> AsyncIterator[dict]:
+        """Pass a live planner run through, storing it once it completes."""
+        recorded = []
+        answer = ""
+        async for event in events:
+            # Sub-agent events arrive wrapped; the inner event's type decides
+            inner = event["event"] if event["type"] == "subagent_event" else event
+            if inner["type"] not in SKIP_REPLAY_EVENTS:
+                recorded.append(event)
+            # The final answer is the planner text after the last round of sub-agents
+            if event["type"] == "subagent_end":
+                answer = ""
+            elif event["type"] == "token":
+                answer += event["content"]
+            yield event
+
+        self.store(query, embedding, version, recorded, answer)
+        logger.info(f"Cached answer for: {query[:80]}")
+
+    def _evict_expired(self) -> None:
+        expired = [key for key, entry in self._entries.items() if entry.age > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_answer_cache: AnswerCache | None = None
+
+
+def get_answer_cache() -> AnswerCache:
+    global _answer_cache
+    if _answer_cache is not None:
+        return _answer_cache
+
+    _answer_cache = AnswerCache()
+    return _answer_cache
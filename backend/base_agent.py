@@ -1,9 +1,25 @@
+import asyncio
 import json
 import logging
+import time
 from collections.abc import AsyncIterator
 
-from backend.config import OPENROUTER_MODEL
-from backend.llm import get_openrouter_client
+from backend.budget import Budget, BudgetTracker, get_budget
+from backend.context import EXPAND_TOOL_NAME, EXPAND_TOOL_SCHEMA, ContextManager, estimate_tokens
+from backend.llm import apply_cache_control, get_openrouter_client, parse_usage
+from backend.metrics import record_llm_call
+from backend.router import (
+    OUTCOME_ANSWER,
+    OUTCOME_DRAFT_DISCARDED,
+    OUTCOME_MALFORMED,
+    OUTCOME_TIMED_OUT,
+    OUTCOME_TOOL_CALLS,
+    ROLE_ANSWER,
+    ROLE_TOOL_SELECTION,
+    get_router,
+)
+from backend.scheduler import get_scheduler
+from backend.sessions import Session
 from backend.tools.base import BaseTool, ToolRequest
 from backend.tracing import get_langfuse
 
@@ -23,15 +39,40 @@ SYSTEM_PROMPT = (
     "Be precise, cite case numbers, and always ground your answers in the data you find."
 )
 
+FINAL_TURN_PROMPT = (
+    "Your research budget is nearly exhausted. Do not call any more tools. "
+    "Write your final answer now using only what you have found so far, and note anything you could not verify."
+)
+
+# A tool-selection turn that has written this much text without starting a tool
+# call is answering; it is cut off here instead of streaming an answer to discard
+DRAFT_ABANDON_CHARS = 400
+
 
 class BaseAgent:
     def __init__(self, tools: list[BaseTool]):
         self.tools = {tool.name: tool for tool in tools}
-        self.tool_schemas = [tool.get_schema() for tool in tools]
+        self.tool_schemas = [tool.get_schema() for tool in tools] + [EXPAND_TOOL_SCHEMA]
+
+    def _is_malformed(self, tool_calls: list[dict]) -> bool:
+        for tc in tool_calls:
+            if not tc["name"]:
+                continue
+            if tc["name"] != EXPAND_TOOL_NAME and tc["name"] not in self.tools:
+                return True
+            try:
+                json.loads(tc["arguments"] or "{}")
+            except json.JSONDecodeError:
+                return True
+        return False
 
-    async def run(self, user_input: str, parent_span=None) -> AsyncIterator[dict]:
+    async def run(
+        self, user_input: str, parent_span=None, budget: Budget | None = None, session: Session | None = None
+    ) -> AsyncIterator[dict]:
         client = get_openrouter_client()
         langfuse = get_langfuse()
+        router = get_router()
+        scheduler = get_scheduler()
 
         trace = None
         if parent_span:
@@ -45,62 +86,173 @@ class BaseAgent:
                 input={"user_input": user_input},
             )
 
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": user_input},
-        ]
+        context = ContextManager()
+        context.append({"role": "system", "content": SYSTEM_PROMPT})
+        context.append({"role": "user", "content": user_input})
+
+        tracker = BudgetTracker(budget or get_budget(None))
+        final_turn = False
+        # Set when the fast model wants to answer; the next turn goes to the answer model
+        answer_turn = False
+        # Set once the fast model produces a malformed tool call; sticks for the rest of the run
+        escalated = False
+        emitted_text = False
 
         iteration = 0
         while True:
-            # Separate text from consecutive LLM calls with a paragraph break
-            if iteration > 0:
-                yield {"type": "token", "content": "\n\n"}
+            # Near exhaustion, force one last tool-free turn for the answer
+            reason = tracker.exhaustion_reason()
+            if reason and not final_turn:
+                final_turn = True
+                context.append({"role": "user", "content": FINAL_TURN_PROMPT})
+                yield {"type": "budget_exhausted", "reason": reason, **tracker.snapshot()}
+                logger.info(f"Budget exhausted ({reason}), forcing final answer")
+
+            role = ROLE_ANSWER if final_turn or answer_turn or escalated else ROLE_TOOL_SELECTION
+            model = router.model_for(role)
+            # Tool-selection text is held back until we know the turn is not an answer
+            draft = role == ROLE_TOOL_SELECTION and model != router.model_for(ROLE_ANSWER)
+            answer_turn = False
 
             generation = None
             if trace:
                 generation = trace.start_generation(
                     name=f"llm-call-{iteration}",
-                    model=OPENROUTER_MODEL,
-                    input=messages,
+                    model=model,
+                    input=context.messages,
+                    metadata={"role": role, "context_tokens": context.total_tokens, "elided": context.elided_count},
                 )
 
             response_text = ""
             tool_calls = []
+            usage = None
+            stream = None
+            first_token_at = None
+            abandoned = False
+            timed_out = False
 
-            stream = await client.chat.completions.create(
-                model=OPENROUTER_MODEL,
-                messages=messages,
-                tools=self.tool_schemas,
-                stream=True,
-            )
+            # The research deadline bounds every read from the stream. Each read gets
+            # its own timeout scope because this generator yields between reads.
+            deadline = asyncio.get_running_loop().time() + tracker.remaining_seconds
+            try:
+                async with scheduler.llm.slot():
+                    started_at = time.monotonic()
+                    async with asyncio.timeout_at(deadline):
+                        stream = await client.chat.completions.create(
+                            model=model,
+                            messages=apply_cache_control(context.messages, model),
+                            tools=self.tool_schemas,
+                            tool_choice="none" if final_turn else "auto",
+                            stream=True,
+                            stream_options={"include_usage": True},
+                        )
 
-            async for chunk in stream:
-                if not chunk.choices:
-                    continue
-                delta = chunk.choices[0].delta
-
-                if delta.content:
-                    response_text += delta.content
-                    yield {"type": "token", "content": delta.content}
-
-                if delta.tool_calls:
-                    for tc in delta.tool_calls:
-                        while len(tool_calls) <= tc.index:
-                            tool_calls.append({"id": "", "name": "", "arguments": ""})
-                        if tc.id:
-                            tool_calls[tc.index]["id"] = tc.id
-                        if tc.function:
-                            if tc.function.name:
-                                tool_calls[tc.index]["name"] = tc.function.name
-                            if tc.function.arguments:
-                                tool_calls[tc.index]["arguments"] += tc.function.arguments
+                    chunks = aiter(stream)
+                    while True:
+                        async with asyncio.timeout_at(deadline):
+                            chunk = await anext(chunks, None)
+                        if chunk is None:
+                            break
+                        if chunk.usage:
+                            usage = parse_usage(chunk.usage)
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta
+                        if first_token_at is None and (delta.content or delta.tool_calls):
+                            first_token_at = time.monotonic()
+
+                        if delta.content:
+                            if not draft:
+                                # Separate text from consecutive LLM calls with a paragraph break
+                                if emitted_text and not response_text:
+                                    yield {"type": "token", "content": "\n\n"}
+                                yield {"type": "token", "content": delta.content}
+                            response_text += delta.content
+
+                        if delta.tool_calls:
+                            for tc in delta.tool_calls:
+                                while len(tool_calls) <= tc.index:
+                                    tool_calls.append({"id": "", "name": "", "arguments": ""})
+                                if tc.id:
+                                    tool_calls[tc.index]["id"] = tc.id
+                                if tc.function:
+                                    if tc.function.name:
+                                        tool_calls[tc.index]["name"] = tc.function.name
+                                    if tc.function.arguments:
+                                        tool_calls[tc.index]["arguments"] += tc.function.arguments
+
+                        if draft and not tool_calls and len(response_text) > DRAFT_ABANDON_CHARS:
+                            abandoned = True
+                            break
+
+                    if abandoned:
+                        # Closing the response stops generation (and billing) upstream
+                        await stream.close()
+            except TimeoutError:
+                timed_out = True
+                if stream is not None:
+                    await stream.close()
+
+            latency = time.monotonic() - started_at
+            ttft = first_token_at - started_at if first_token_at else None
+            record_llm_call(model, role, ttft, latency, usage)
+            has_tool_calls = not final_turn and not timed_out and any(tc["name"] for tc in tool_calls)
+            if timed_out:
+                outcome = OUTCOME_TIMED_OUT
+            elif draft and has_tool_calls and self._is_malformed(tool_calls):
+                outcome = OUTCOME_MALFORMED
+            elif draft and not has_tool_calls:
+                outcome = OUTCOME_DRAFT_DISCARDED
+            else:
+                outcome = OUTCOME_TOOL_CALLS if has_tool_calls else OUTCOME_ANSWER
+            router.record(role, model, latency, usage, outcome)
 
             if generation:
-                generation.update(output={"response": response_text, "tool_calls": tool_calls})
+                generation.update(
+                    output={"response": response_text, "tool_calls": tool_calls},
+                    usage_details=usage,
+                    metadata={"outcome": outcome, "latency": latency},
+                )
                 generation.end()
 
-            # No tool calls = final answer
-            if not any(tc["name"] for tc in tool_calls):
+            if abandoned:
+                logger.info(f"LLM call {iteration}: draft abandoned after {len(response_text)} chars")
+            if timed_out:
+                logger.warning(f"LLM call {iteration}: research deadline reached after {latency:.1f}s")
+            if usage:
+                logger.info(
+                    f"LLM call {iteration}: input={usage['input_tokens']} "
+                    f"cached={usage['cached_input_tokens']} output={usage['output_tokens']}"
+                )
+                yield {"type": "usage", "iteration": iteration, "role": role, "model": model, **usage}
+                tracker.record_usage(usage["input_tokens"], usage["output_tokens"])
+            else:
+                # Provider did not report usage; fall back to our own estimate
+                tracker.record_usage(context.total_tokens, estimate_tokens(response_text))
+
+            yield {"type": "budget", **tracker.snapshot()}
+            iteration += 1
+
+            # Nothing from a discarded turn enters the history, so the retry sees the same prompt
+            if outcome == OUTCOME_MALFORMED:
+                escalated = True
+                continue
+            if outcome == OUTCOME_DRAFT_DISCARDED:
+                answer_turn = True
+                continue
+
+            if draft and response_text:
+                if emitted_text:
+                    yield {"type": "token", "content": "\n\n"}
+                yield {"type": "token", "content": response_text}
+            emitted_text = emitted_text or bool(response_text)
+
+            if timed_out:
+                # Whatever the turn wrote before the deadline is the answer
+                yield {"type": "budget_exhausted", "reason": "deadline", **tracker.snapshot()}
+
+            # No tool calls (or no budget left for them) = final answer
+            if not has_tool_calls:
                 if trace:
                     trace.update(output={"response": response_text})
                     trace.end()
@@ -117,7 +269,7 @@ class BaseAgent:
                 for tc in tool_calls
                 if tc["name"]
             ]
-            messages.append(assistant_msg)
+            context.append(assistant_msg)
 
             # Execute each tool call
             for tc in tool_calls:
@@ -127,11 +279,40 @@ class BaseAgent:
                 tool_name = tc["name"]
                 tool_id = tc["id"]
 
-                tool_input = json.loads(tc["arguments"]) if tc["arguments"] else {}
+                try:
+                    tool_input = json.loads(tc["arguments"]) if tc["arguments"] else {}
+                except json.JSONDecodeError:
+                    context.append({
+                        "role": "tool",
+                        "tool_call_id": tool_id,
+                        "content": json.dumps({"error": "Tool arguments are not valid JSON"}),
+                    })
+                    continue
+
+                # The budget can run out part-way through a batch of tool calls
+                reason = tracker.exhaustion_reason()
+                if reason:
+                    context.append({
+                        "role": "tool",
+                        "tool_call_id": tool_id,
+                        "content": json.dumps({"error": f"Research budget exhausted ({reason})"}),
+                    })
+                    continue
+                tracker.record_tool_call()
+
+                if tool_name == EXPAND_TOOL_NAME:
+                    handle = tool_input.get("handle", "")
+                    expanded = context.expand(handle)
+                    context.append({
+                        "role": "tool",
+                        "tool_call_id": tool_id,
+                        "content": expanded if expanded is not None else json.dumps({"error": f"Unknown handle: {handle}"}),
+                    })
+                    continue
 
                 tool = self.tools.get(tool_name)
                 if not tool:
-                    messages.append({
+                    context.append({
                         "role": "tool",
                         "tool_call_id": tool_id,
                         "content": json.dumps({"error": f"Unknown tool: {tool_name}"}),
@@ -144,9 +325,22 @@ class BaseAgent:
                 if trace:
                     tool_span = trace.start_span(name=f"tool-{tool_name}", input=tool_input)
 
-                result = await tool.execute(ToolRequest(parameters=tool_input))
-
-                result_payload = result.data if result.success else {"error": result.error}
+                # A resumed session reuses results the interrupted run already got
+                result_payload = session.get_tool_result(tool_name, tool_input) if session else None
+                if result_payload is not None:
+                    logger.info(f"Tool {tool_name} -> reused from session {session.id}")
+                else:
+                    try:
+                        async with asyncio.timeout(tracker.remaining_tool_seconds):
+                            result = await tool.execute(ToolRequest(parameters=tool_input))
+                    except TimeoutError:
+                        result_payload = {"error": "Research deadline reached before the tool finished"}
+                        logger.warning(f"Tool {tool_name} -> cut off by the research deadline")
+                    else:
+                        result_payload = result.data if result.success else {"error": result.error}
+                        if session and result.success:
+                            session.save_tool_result(tool_name, tool_input, result_payload)
+                        logger.info(f"Tool {tool_name} -> success={result.success}")
 
                 yield {"type": "tool_end", "name": tool_name, "output": result_payload}
 
@@ -154,12 +348,8 @@ class BaseAgent:
                     tool_span.update(output=result_payload)
                     tool_span.end()
 
-                messages.append({
+                context.append({
                     "role": "tool",
                     "tool_call_id": tool_id,
                     "content": json.dumps(result_payload),
                 })
-
-                logger.info(f"Tool {tool_name} -> success={result.success}")
-
-            iteration += 1
@@ -0,0 +1,83 @@
+import time
+from dataclasses import dataclass, field
+
+# Fraction of the time or token allowance after which the agent must answer
+FINAL_TURN_RATIO = 0.85
+
+
+@dataclass
+class Budget:
+    deadline_seconds: float
+    max_input_tokens: int
+    max_output_tokens: int
+    max_tool_calls: int
+
+
+BUDGETS: dict[str, Budget] = {
+    "quick": Budget(deadline_seconds=45, max_input_tokens=60000, max_output_tokens=4000, max_tool_calls=4),
+    "standard": Budget(deadline_seconds=120, max_input_tokens=200000, max_output_tokens=8000, max_tool_calls=10),
+    "deep": Budget(deadline_seconds=240, max_input_tokens=400000, max_output_tokens=16000, max_tool_calls=20),
+}
+
+DEFAULT_EFFORT = "standard"
+
+
+def get_budget(effort: str | None) -> Budget:
+    return BUDGETS.get(effort or DEFAULT_EFFORT, BUDGETS[DEFAULT_EFFORT])
+
+
+@dataclass
+class BudgetTracker:
+    budget: Budget
+    started_at: float = field(default_factory=time.monotonic)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    tool_calls: int = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def remaining_seconds(self) -> float:
+        return max(self.budget.deadline_seconds - self.elapsed, 0)
+
+    @property
+    def remaining_tool_seconds(self) -> float:
+        """Time a tool may take without eating into the final turn's share of the deadline."""
+        return max(self.budget.deadline_seconds * FINAL_TURN_RATIO - self.elapsed, 0)
+
+    @property
+    def remaining_tool_calls(self) -> int:
+        return max(self.budget.max_tool_calls - self.tool_calls, 0)
+
+    def record_usage(self, input_tokens: int, output_tokens: int) -> None:
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+
+    def record_tool_call(self) -> None:
+        self.tool_calls += 1
+
+    def exhaustion_reason(self) -> str | None:
+        """Return why the agent must move to its final answer, or None if it can keep going."""
+        if self.tool_calls >= self.budget.max_tool_calls:
+            return "tool_calls"
+        if self.elapsed >= self.budget.deadline_seconds * FINAL_TURN_RATIO:
+            return "time"
+        if self.input_tokens >= self.budget.max_input_tokens * FINAL_TURN_RATIO:
+            return "input_tokens"
+        if self.output_tokens >= self.budget.max_output_tokens * FINAL_TURN_RATIO:
+            return "output_tokens"
+        return None
+
+    def snapshot(self) -> dict:
+        return {
+            "elapsed_seconds": round(self.elapsed, 2),
+            "deadline_seconds": self.budget.deadline_seconds,
+            "input_tokens": self.input_tokens,
+            "max_input_tokens": self.budget.max_input_tokens,
+            "output_tokens": self.output_tokens,
+            "max_output_tokens": self.budget.max_output_tokens,
+            "tool_calls": self.tool_calls,
+            "max_tool_calls": self.budget.max_tool_calls,
+        }
@@ -6,11 +6,63 @@ load_dotenv(Path(__file__).parent / ".env")
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "anthropic/claude-sonnet-4")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 
 LANGFUSE_SECRET_KEY = os.getenv("LANGFUSE_SECRET_KEY")
 LANGFUSE_PUBLIC_KEY = os.getenv("LANGFUSE_PUBLIC_KEY")
 LANGFUSE_HOST = os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com")
 
 DATA_DIR = os.getenv("DATA_DIR", "/Users/atharva/workspace/code/projects/buildindia/data")
+CASES_DB_PATH = os.getenv("CASES_DB_PATH", "/Users/atharva/workspace/code/projects/buildindia/cases.db")
+CHROMA_DIR = os.getenv("CHROMA_DIR", "/Users/atharva/workspace/code/projects/buildindia/chroma_db")
+# "default" is Chroma's MiniLM model; "hash" is an offline feature-hashing embedder for benchmarks
+EMBEDDING_FUNCTION = os.getenv("EMBEDDING_FUNCTION", "default")
+# Point PDF downloads at an S3-compatible stand-in instead of AWS
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
 
 MAX_TOOL_CALLS = 10
+
+# Approximate token budget for a single BaseAgent's message history
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "60000"))
+# Most recent tool results are always kept verbatim
+CONTEXT_KEEP_RECENT_TOOL_RESULTS = int(os.getenv("CONTEXT_KEEP_RECENT_TOOL_RESULTS", "2"))
+
+# Model routing per role (see backend/router.py)
+ROUTE_TOOL_SELECTION_MODEL = os.getenv("ROUTE_TOOL_SELECTION_MODEL", "anthropic/claude-3.5-haiku")
+ROUTE_ANSWER_MODEL = os.getenv("ROUTE_ANSWER_MODEL", OPENROUTER_MODEL)
+ROUTE_PLANNER_MODEL = os.getenv("ROUTE_PLANNER_MODEL", OPENROUTER_MODEL)
+
+# Admission control and shared resource pools (see backend/scheduler.py)
+MAX_ACTIVE_REQUESTS = int(os.getenv("MAX_ACTIVE_REQUESTS", "8"))
+MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS", "16"))
+POOL_LLM_LIMIT = int(os.getenv("POOL_LLM_LIMIT", "16"))
+POOL_SQL_LIMIT = int(os.getenv("POOL_SQL_LIMIT", "4"))
+POOL_VECTOR_LIMIT = int(os.getenv("POOL_VECTOR_LIMIT", "2"))
+POOL_BASH_LIMIT = int(os.getenv("POOL_BASH_LIMIT", "8"))
+POOL_PDF_LIMIT = int(os.getenv("POOL_PDF_LIMIT", "4"))
+
+# Semantic cache for whole planner runs (see backend/answer_cache.py)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "256"))
+# Bump when the case data is re-ingested; derived from partition directory mtimes when unset
+DATA_CATALOG_VERSION = os.getenv("DATA_CATALOG_VERSION")
+
+# Compact /query streaming (see backend/streaming.py)
+STREAM_COALESCE_MS = int(os.getenv("STREAM_COALESCE_MS", "400"))
+STREAM_COALESCE_MAX_CHARS = int(os.getenv("STREAM_COALESCE_MAX_CHARS", "4096"))
+STREAM_MAX_TOOL_OUTPUT = int(os.getenv("STREAM_MAX_TOOL_OUTPUT", "2000"))
+
+# Resumable planner sessions (see backend/sessions.py)
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", str(Path(__file__).parent / "sessions.db"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(7 * 86400)))
+
+# Load tool dependencies in the background at startup; otherwise on first use
+WARM_UP_ON_STARTUP = os.getenv("WARM_UP_ON_STARTUP", "true").lower() == "true"
+
+# Shared retrieval sidecar (see backend/retrieval_server.py); unset runs search and SQL in-process
+RETRIEVAL_SOCKET = os.getenv("RETRIEVAL_SOCKET")
+RETRIEVAL_BATCH_MS = int(os.getenv("RETRIEVAL_BATCH_MS", "5"))
+RETRIEVAL_MAX_BATCH = int(os.getenv("RETRIEVAL_MAX_BATCH", "32"))
+RETRIEVAL_CONNECT_TIMEOUT = float(os.getenv("RETRIEVAL_CONNECT_TIMEOUT", "60"))
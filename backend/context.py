@@ -0,0 +1,139 @@
+import json
+import logging
+import uuid
+
+from backend.config import CONTEXT_KEEP_RECENT_TOOL_RESULTS, CONTEXT_TOKEN_BUDGET
+
+# Rough chars-per-token ratio; good enough for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Per-message overhead for role, ids and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Compact down to this fraction of the budget so elision happens in rare batches
+COMPACT_TARGET_RATIO = 0.75
+
+PREVIEW_LENGTH = 300
+
+logger = logging.getLogger(__name__)
+
+EXPAND_TOOL_NAME = "expand_result"
+
+EXPAND_TOOL_SCHEMA = {
+    "type": "function",
+    "function": {
+        "name": EXPAND_TOOL_NAME,
+        "description": (
+            "Re-expand an earlier tool result that was elided to save context. "
+            "Elided results show a handle like 'r-1a2b3c4d'; pass it here to get the full output back."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "handle": {
+                    "type": "string",
+                    "description": "The handle from the elided tool result.",
+                },
+            },
+            "required": ["handle"],
+        },
+    },
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def message_tokens(message: dict) -> int:
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    if message.get("content"):
+        tokens += estimate_tokens(message["content"])
+    if message.get("tool_calls"):
+        tokens += estimate_tokens(json.dumps(message["tool_calls"]))
+    return tokens
+
+
+class ContextManager:
+    """Keep an agent's message list under a token budget.
+
+    Token counts are tracked per message as they are appended. Once the total
+    goes over budget, the oldest tool results (outside the most recent few) are
+    replaced with a short preview and a handle that `expand` can resolve.
+
+    Eliding rewrites a message in place, so the provider's prompt cache is lost
+    from the first elided message onward. Compacting well under the budget keeps
+    these rewrites to rare batches.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        keep_recent: int = CONTEXT_KEEP_RECENT_TOOL_RESULTS,
+    ):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.messages: list[dict] = []
+        self.total_tokens = 0
+        self._tokens: list[int] = []
+        self._elided: dict[str, str] = {}  # handle -> original content
+        self._elided_indexes: set[int] = set()
+
+    def append(self, message: dict) -> None:
+        tokens = message_tokens(message)
+        self.messages.append(message)
+        self._tokens.append(tokens)
+        self.total_tokens += tokens
+
+        if self.total_tokens > self.token_budget:
+            self._compact()
+
+    def expand(self, handle: str) -> str | None:
+        return self._elided.get(handle)
+
+    @property
+    def elided_count(self) -> int:
+        return len(self._elided)
+
+    def _compact(self) -> None:
+        target = int(self.token_budget * COMPACT_TARGET_RATIO)
+
+        tool_indexes = [i for i, m in enumerate(self.messages) if m["role"] == "tool"]
+        candidates = tool_indexes[: -self.keep_recent] if self.keep_recent else tool_indexes
+
+        elided = []
+        for i in candidates:
+            if self.total_tokens <= target:
+                break
+            if i in self._elided_indexes:
+                continue
+            if self._elide(i):
+                elided.append(i)
+
+        if elided:
+            logger.info(
+                f"Elided {len(elided)} tool result(s) down to {self.total_tokens} tokens; "
+                f"prompt cache resets from message {elided[0]}"
+            )
+
+    def _elide(self, index: int) -> bool:
+        message = self.messages[index]
+        content = message["content"] or ""
+
+        handle = f"r-{uuid.uuid4().hex[:8]}"
+        preview = content[:PREVIEW_LENGTH].replace("\n", " ")
+        stub = (
+            f"[elided tool result {handle}: {len(content)} chars. Preview: {preview}... "
+            f"Call {EXPAND_TOOL_NAME} with handle='{handle}' to see the full output.]"
+        )
+        if estimate_tokens(stub) >= estimate_tokens(content):
+            return False
+
+        self._elided[handle] = content
+        self._elided_indexes.add(index)
+        self.messages[index] = {**message, "content": stub}
+
+        new_tokens = message_tokens(self.messages[index])
+        self.total_tokens += new_tokens - self._tokens[index]
+        self._tokens[index] = new_tokens
+        return True
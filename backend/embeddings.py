@@ -0,0 +1,54 @@
+import hashlib
+import re
+
+import numpy as np
+from chromadb import Documents, EmbeddingFunction, Embeddings
+from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+from backend.config import EMBEDDING_FUNCTION
+
+HASH_DIMENSIONS = 384
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class HashEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Deterministic bag-of-words embeddings via feature hashing.
+
+    Needs no model download, so benchmarks and fixtures work offline. Retrieval
+    quality is far below the default model; never use it for real data.
+    """
+
+    def __init__(self, dimensions: int = HASH_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def __call__(self, input: Documents) -> Embeddings:
+        embeddings = []
+        for text in input:
+            vector = np.zeros(self.dimensions, dtype=np.float32)
+            for token in _TOKEN_RE.findall(text.lower()):
+                digest = hashlib.md5(token.encode()).digest()
+                index = int.from_bytes(digest[:4], "little") % self.dimensions
+                vector[index] += 1.0 if digest[4] & 1 else -1.0
+            norm = np.linalg.norm(vector)
+            embeddings.append(vector / norm if norm else vector)
+        return embeddings
+
+    @staticmethod
+    def name() -> str:
+        return "themis-hash"
+
+
+_embedding_function: EmbeddingFunction | None = None
+
+
+def get_embedding_function() -> EmbeddingFunction:
+    global _embedding_function
+    if _embedding_function is not None:
+        return _embedding_function
+
+    if EMBEDDING_FUNCTION == "hash":
+        _embedding_function = HashEmbeddingFunction()
+    else:
+        _embedding_function = DefaultEmbeddingFunction()
+    return _embedding_function
@@ -1,17 +1,75 @@
-from openai import AsyncOpenAI
+from typing import TYPE_CHECKING
 
-from backend.config import OPENROUTER_API_KEY
+from backend.config import OPENROUTER_API_KEY, OPENROUTER_BASE_URL
+from backend.models_config import get_model_config
 
-_client: AsyncOpenAI | None = None
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
+_client: "AsyncOpenAI | None" = None
 
-def get_openrouter_client() -> AsyncOpenAI:
+
+def get_openrouter_client() -> "AsyncOpenAI":
     global _client
     if _client is not None:
         return _client
 
+    # The SDK takes a noticeable share of startup, so it loads on first use or during warm-up
+    from openai import AsyncOpenAI
+
     _client = AsyncOpenAI(
-        base_url="https://openrouter.ai/api/v1",
+        base_url=OPENROUTER_BASE_URL,
         api_key=OPENROUTER_API_KEY,
     )
     return _client
+
+
+def supports_cache_control(model: str) -> bool:
+    config = get_model_config(model)
+    if config is not None:
+        return config.cache_control
+    return model.startswith("anthropic/")
+
+
+def _with_breakpoint(message: dict) -> dict:
+    return {
+        **message,
+        "content": [{"type": "text", "text": message["content"], "cache_control": {"type": "ephemeral"}}],
+    }
+
+
+def apply_cache_control(messages: list[dict], model: str) -> list[dict]:
+    """Return a copy of messages with cache breakpoints on the stable prefixes.
+
+    The system prompt (which also covers the tool schemas) gets one breakpoint,
+    and the latest text message gets another so the append-only history is
+    cached between iterations. The stored messages are never modified here, so
+    the prefix stays byte-identical from call to call until ContextManager
+    elides an older tool result, which resets the cache from that message on.
+    """
+    if not supports_cache_control(model):
+        return messages
+
+    marked = list(messages)
+    if isinstance(marked[0].get("content"), str):
+        marked[0] = _with_breakpoint(marked[0])
+
+    for i in range(len(marked) - 1, 1, -1):
+        if isinstance(marked[i].get("content"), str) and marked[i]["content"]:
+            marked[i] = _with_breakpoint(marked[i])
+            break
+
+    return marked
+
+
+def parse_usage(usage) -> dict:
+    """Normalise an OpenAI-style usage object into cached/uncached input token counts."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = (getattr(details, "cached_tokens", None) or 0) if details else 0
+    input_tokens = usage.prompt_tokens or 0
+    return {
+        "input_tokens": input_tokens,
+        "cached_input_tokens": cached,
+        "uncached_input_tokens": input_tokens - cached,
+        "output_tokens": usage.completion_tokens or 0,
+    }
@@ -1,21 +1,59 @@
+import asyncio
 import json
 import logging
+import time
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 
 logger = logging.getLogger(__name__)
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
+from backend.answer_cache import catalog_version, get_answer_cache
 from backend.base_agent import BaseAgent
+from backend.config import WARM_UP_ON_STARTUP
+from backend.llm import get_openrouter_client
+from backend.metrics import ACTIVE_REQUESTS, CACHE_LOOKUPS, render_metrics
 from backend.planner_agent import PlannerAgent
+from backend.router import get_router
+from backend.scheduler import QueueFullError, current_request, get_scheduler, new_request_id
+from backend.sessions import STATUS_DONE, SessionBusyError, get_session_store
+from backend.streaming import GzipStream, coalesce_events, get_output_store, sse_frame
 from backend.tools.bash import BashTool
 from backend.tools.chromadb_tool import ChromaDBTool
 from backend.tools.duckdb_tool import DuckDBTool
 from backend.tools.pdf_tool import PDFTool
+from backend.tools.registry import ToolRegistry
 
-app = FastAPI()
+# Startup bookkeeping reported by /health/ready
+_module_loaded_at = time.monotonic()
+_warm_up_task: asyncio.Task | None = None
+_warm_up_seconds: float | None = None
+
+
+async def warm_up():
+    """Load the LLM client and every tool's dependencies in the background."""
+    global _warm_up_seconds
+    started_at = time.monotonic()
+    await asyncio.to_thread(get_openrouter_client)
+    await registry.warm_up()
+    _warm_up_seconds = round(time.monotonic() - started_at, 3)
+    logger.info(f"Warm-up finished in {_warm_up_seconds}s: {registry.snapshot()}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _warm_up_task
+    if WARM_UP_ON_STARTUP:
+        _warm_up_task = asyncio.create_task(warm_up())
+    yield
+    if _warm_up_task is not None:
+        _warm_up_task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,28 +62,268 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-base_agent = BaseAgent(tools=[BashTool(), DuckDBTool(), ChromaDBTool(), PDFTool()])
+registry = ToolRegistry([BashTool(), DuckDBTool(), ChromaDBTool(), PDFTool()])
+base_agent = BaseAgent(tools=registry.list())
 planner = PlannerAgent(base_agent=base_agent)
 logger.info("Themis started: PlannerAgent -> BaseAgent")
 
 
 class QueryRequest(BaseModel):
     input: str
+    # Skip the answer cache and run fresh research; the result replaces the cached answers it matches
+    bypass_cache: bool = False
+    # Coalesce each agent's tokens into frames (STREAM_COALESCE_MS) and truncate large tool outputs (kept at /tool-outputs/{ref})
+    compact: bool = False
+    # Gzip the event stream when the client accepts it
+    gzip: bool = False
+    # Reconnect to an earlier run: its events are replayed and research continues from the last checkpoint
+    session_id: str | None = None
+    # SSE id of the last event the client saw; earlier events are not replayed (ids are sent when compact is off)
+    last_event_id: int = 0
 
 
 @app.get("/health")
+@app.get("/health/live")
 async def health():
     return {"status": "ok", "service": "themis"}
 
 
+@app.get("/health/ready")
+async def ready():
+    """Ready once warm-up has finished; tools that failed to warm up are reported but do not block."""
+    is_ready = _warm_up_task is None or _warm_up_task.done()
+    body = {
+        "status": "ready" if is_ready else "warming",
+        "uptime_seconds": round(time.monotonic() - _module_loaded_at, 3),
+        "warm_up_seconds": _warm_up_seconds,
+        "tools": registry.snapshot(),
+    }
+    return JSONResponse(body, status_code=200 if is_ready else 503)
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/routing")
+async def routing():
+    router = get_router()
+    return {"routes": router.routes, "stats": router.stats()}
+
+
+@app.get("/scheduler")
+async def scheduler_status():
+    return get_scheduler().snapshot()
+
+
+@app.get("/answer-cache")
+async def answer_cache_status():
+    return get_answer_cache().stats()
+
+
+@app.get("/sessions/{session_id}")
+async def session_status(session_id: str):
+    session = await get_session_store().load(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session expired or not found")
+    return {
+        "session_id": session.id,
+        "status": session.status,
+        "iteration": session.iteration,
+        "events": session.seq,
+        "completed_agents": list(session.subagent_results),
+    }
+
+
+@app.get("/tool-outputs/{ref}")
+async def tool_output(ref: str):
+    output = get_output_store().get(ref)
+    if output is None:
+        raise HTTPException(status_code=404, detail="Tool output expired or not found")
+    return output
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """Calls `on_close` once the response is over, however it ended.
+
+    A body generator's own `finally` never runs if Starlette never starts
+    iterating it, e.g. when the client is gone before the first chunk.
+    """
+
+    def __init__(self, *args, on_close=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.on_close is not None:
+                self.on_close()
+
+
+def event_stream_response(frames, gzip: bool, on_close=None) -> StreamingResponse:
+    if not gzip:
+        return ClosingStreamingResponse(frames, media_type="text/event-stream", on_close=on_close)
+
+    async def compressed():
+        compressor = GzipStream()
+        async for frame in frames:
+            yield compressor.frame(frame)
+        yield compressor.close()
+
+    return ClosingStreamingResponse(
+        compressed(), media_type="text/event-stream", headers={"Content-Encoding": "gzip"}, on_close=on_close
+    )
+
+
+async def session_events(session, after_seq: int, live=None):
+    """Recorded events after `after_seq`, then the live run, as (seq, event) pairs."""
+    for seq, event in await session.replay(after_seq):
+        yield seq, event
+    if live is not None:
+        async for event in live:
+            yield session.seq, event
+
+
+async def session_frames(pairs, compact: bool):
+    # Coalesced frames span several events, so only uncompacted streams carry ids
+    if not compact:
+        async for seq, event in pairs:
+            yield sse_frame(event, compact, seq)
+        return
+
+    async def events():
+        async for _, event in pairs:
+            yield event
+
+    async for event in coalesce_events(events()):
+        yield sse_frame(event, compact)
+
+
+def capacity_error() -> HTTPException:
+    return HTTPException(status_code=429, detail="Server is at capacity, try again shortly.", headers={"Retry-After": "5"})
+
+
 @app.post("/query")
-async def query(request: QueryRequest):
-    async def stream():
-        async for event in planner.run(request.input):
-            yield f"data: {json.dumps(event)}\n\n"
-        yield 'data: {"type": "done"}\n\n'
+async def query(request: QueryRequest, http_request: Request):
+    compact = request.compact
+    gzip = request.gzip and "gzip" in http_request.headers.get("accept-encoding", "")
 
-    return StreamingResponse(stream(), media_type="text/event-stream")
+    sessions = get_session_store()
+    session = None
+    if request.session_id:
+        session = await sessions.load(request.session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session expired or not found")
+    resumed = session is not None
+
+    # A finished session only needs its events replayed
+    if resumed and session.status == STATUS_DONE:
+        async def replay_session():
+            yield sse_frame({"type": "session", "session_id": session.id, "resumed": True}, compact)
+            async for frame in session_frames(session_events(session, request.last_event_id), compact):
+                yield frame
+            yield sse_frame({"type": "done"}, compact)
+
+        return event_stream_response(replay_session(), gzip)
+
+    admission = get_scheduler().admission
+    answer_cache = get_answer_cache()
+    embedding = version = None
+    if answer_cache.enabled and not resumed:
+        # Embedding takes a model call; a full server answers 429 without it
+        if admission.full:
+            logger.info("Rejected /query before cache lookup: server at capacity")
+            raise capacity_error()
+        embedding = await answer_cache.embed(request.input)
+        version = catalog_version()
+        hit = None
+        if request.bypass_cache:
+            answer_cache.bypasses += 1
+            CACHE_LOOKUPS.inc(result="bypass")
+        else:
+            hit = answer_cache.lookup(embedding, version)
+
+        # Hits are replayed straight away, without waiting for admission
+        if hit:
+            async def replay():
+                events = answer_cache.replay(*hit)
+                if compact:
+                    events = coalesce_events(events)
+                async for event in events:
+                    yield sse_frame(event, compact)
+                yield sse_frame({"type": "done"}, compact)
+
+            return event_stream_response(replay(), gzip)
+
+    # Admission comes first, so a rejected request never leaves a session behind
+    try:
+        ticket = admission.reserve()
+    except QueueFullError as e:
+        logger.info(f"Rejected /query: {e}")
+        raise capacity_error()
+
+    acquired = None
+    released = False
+
+    def release():
+        # Runs from the body's finally and again when the response closes; only the first counts
+        nonlocal released
+        if released:
+            return
+        released = True
+        admission.release(ticket)
+        if acquired is not None:
+            sessions.release(acquired)
+
+    try:
+        if session is None:
+            session = sessions.create(request.input)
+        try:
+            sessions.acquire(session)
+        except SessionBusyError:
+            raise HTTPException(status_code=409, detail="Session is already streaming to another client.")
+        acquired = session
+
+        request_id = new_request_id()
+
+        async def stream():
+            current_request.set(request_id)
+            ACTIVE_REQUESTS.inc()
+            try:
+                yield sse_frame({"type": "session", "session_id": session.id, "resumed": resumed}, compact)
+                async for position in admission.wait(ticket):
+                    yield sse_frame({"type": "queued", "position": position}, compact)
+
+                if resumed:
+                    restarted = session.rewind()
+                    logger.info(f"Resuming session {session.id}: restarting {len(restarted)} sub-agent(s)")
+                    yield sse_frame(
+                        {
+                            "type": "session_resumed",
+                            "completed_agents": list(session.subagent_results),
+                            "restarted_agents": restarted,
+                        },
+                        compact,
+                    )
+
+                events = session.recorded(planner.run(session.input, session=session))
+                if answer_cache.enabled and not resumed:
+                    events = answer_cache.record(events, request.input, embedding, version)
+
+                async for frame in session_frames(session_events(session, request.last_event_id, events), compact):
+                    yield frame
+                yield sse_frame({"type": "done"}, compact)
+            finally:
+                ACTIVE_REQUESTS.dec()
+                release()
+
+        return event_stream_response(stream(), gzip, on_close=release)
+    except BaseException:
+        release()
+        raise
 
 
 @app.post("/test-parallel")
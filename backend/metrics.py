@@ -0,0 +1,128 @@
+# Minimal in-process metrics rendered in the Prometheus text format at /metrics.
+# Updates happen on the event loop, so they are plain dict operations without locks.
+
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+SIZE_BUCKETS = (100, 1000, 5000, 10000, 25000, 50000, 100000)
+FANOUT_BUCKETS = (1, 2, 3, 4, 5)
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+        # key -> (per-bucket counts with a trailing +Inf slot, sum)
+        self._values: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            cumulative += counts[-1]
+            bucket_labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total[0]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+REGISTRY: list[_Metric] = []
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+LLM_TTFT = Histogram("themis_llm_ttft_seconds", "Time from request to first streamed token or tool call.", ("model", "role"))
+LLM_STREAM = Histogram("themis_llm_stream_seconds", "Total LLM stream time.", ("model", "role"))
+LLM_INPUT_TOKENS = Counter("themis_llm_input_tokens_total", "LLM input tokens, split by prompt-cache status.", ("model", "cached"))
+LLM_OUTPUT_TOKENS = Counter("themis_llm_output_tokens_total", "LLM output tokens.", ("model",))
+
+TOOL_DURATION = Histogram("themis_tool_duration_seconds", "Tool execution latency, including pool queue wait.", ("tool",))
+TOOL_CALLS = Counter("themis_tool_calls_total", "Tool executions by outcome.", ("tool", "success"))
+TOOL_OUTPUT_BYTES = Histogram("themis_tool_output_bytes", "Size of tool output payloads.", ("tool",), buckets=SIZE_BUCKETS)
+
+PLANNER_FANOUT = Histogram("themis_planner_fanout", "Sub-agents launched per planner turn.", buckets=FANOUT_BUCKETS)
+
+QUEUE_WAIT = Histogram("themis_queue_wait_seconds", "Time spent waiting for admission or a resource pool slot.", ("pool",))
+
+CACHE_LOOKUPS = Counter("themis_cache_lookups_total", "Answer cache lookups by result.", ("result",))
+
+ACTIVE_REQUESTS = Gauge("themis_active_requests", "/query requests currently streaming.")
+
+
+def record_llm_call(model: str, role: str, ttft: float | None, duration: float, usage: dict | None) -> None:
+    if ttft is not None:
+        LLM_TTFT.observe(ttft, model=model, role=role)
+    LLM_STREAM.observe(duration, model=model, role=role)
+    if usage:
+        LLM_INPUT_TOKENS.inc(usage["cached_input_tokens"], model=model, cached="true")
+        LLM_INPUT_TOKENS.inc(usage["uncached_input_tokens"], model=model, cached="false")
+        LLM_OUTPUT_TOKENS.inc(usage["output_tokens"], model=model)
@@ -7,6 +7,8 @@ class ModelConfig:
     name: str
     provider: str
     max_output_tokens: int = 64000
+    # Needs explicit cache_control breakpoints for prompt caching (others cache automatically)
+    cache_control: bool = False
 
 
 MODELS: list[ModelConfig] = [
@@ -14,11 +16,13 @@ MODELS: list[ModelConfig] = [
         id="anthropic/claude-sonnet-4",
         name="Claude Sonnet 4",
         provider="Anthropic",
+        cache_control=True,
     ),
     ModelConfig(
         id="anthropic/claude-3.5-haiku",
         name="Claude 3.5 Haiku",
         provider="Anthropic",
+        cache_control=True,
     ),
     ModelConfig(
         id="openai/gpt-4o",
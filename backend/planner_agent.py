@@ -1,11 +1,18 @@
 import asyncio
 import json
 import logging
+import time
 from collections.abc import AsyncIterator
+from dataclasses import asdict
 
-from backend.config import OPENROUTER_MODEL, MAX_TOOL_CALLS
-from backend.llm import get_openrouter_client
+from backend.config import MAX_TOOL_CALLS
+from backend.llm import apply_cache_control, get_openrouter_client, parse_usage
 from backend.base_agent import BaseAgent
+from backend.budget import BUDGETS, DEFAULT_EFFORT, get_budget
+from backend.metrics import PLANNER_FANOUT, record_llm_call
+from backend.router import OUTCOME_ANSWER, OUTCOME_TOOL_CALLS, ROLE_PLANNER, get_router
+from backend.scheduler import get_scheduler
+from backend.sessions import Session, pending_tool_calls
 from backend.tracing import get_langfuse
 
 logger = logging.getLogger(__name__)
@@ -17,6 +24,7 @@ PLANNER_SYSTEM_PROMPT = (
     "Instruct it to prefer ChromaDB and DuckDB — they are faster and more reliable. Bash should only be used as a last resort. "
     "Your job: break down the user's question, call research_agent one or more times, then synthesize the results. "
     "You can launch up to 3 research_agent calls in parallel in a single response to speed up research. "
+    "Set each call's effort to match the task: 'quick' for a single lookup, 'deep' only for broad multi-step research. "
     "Never answer from memory — always delegate to research_agent first."
 )
 
@@ -31,7 +39,15 @@ RESEARCH_AGENT_TOOL = {
                 "instructions": {
                     "type": "string",
                     "description": "Detailed instructions for what the research agent should find or do.",
-                }
+                },
+                "effort": {
+                    "type": "string",
+                    "enum": list(BUDGETS),
+                    "description": (
+                        "Time, token and tool-call budget for this task. "
+                        f"Defaults to '{DEFAULT_EFFORT}'. The agent is forced to answer when it runs out."
+                    ),
+                },
             },
             "required": ["instructions"],
         },
@@ -43,9 +59,12 @@ class PlannerAgent:
     def __init__(self, base_agent: BaseAgent):
         self.base_agent = base_agent
 
-    async def run(self, user_input: str) -> AsyncIterator[dict]:
+    async def run(self, user_input: str, session: Session | None = None) -> AsyncIterator[dict]:
         client = get_openrouter_client()
         langfuse = get_langfuse()
+        router = get_router()
+        scheduler = get_scheduler()
+        model = router.model_for(ROLE_PLANNER)
 
         trace = None
         if langfuse:
@@ -58,98 +77,150 @@ class PlannerAgent:
             {"role": "system", "content": PLANNER_SYSTEM_PROMPT},
             {"role": "user", "content": user_input},
         ]
+        start_iteration = 0
+        if session and session.planner_messages:
+            messages = session.planner_messages
+            start_iteration = session.iteration
 
-        for iteration in range(MAX_TOOL_CALLS):
-            generation = None
-            if trace:
-                generation = trace.start_generation(
-                    name=f"planner-llm-call-{iteration}",
-                    model=OPENROUTER_MODEL,
-                    input=messages,
-                )
-
-            response_text = ""
-            tool_calls = []
-
-            stream = await client.chat.completions.create(
-                model=OPENROUTER_MODEL,
-                messages=messages,
-                tools=[RESEARCH_AGENT_TOOL],
-                stream=True,
-            )
+        for iteration in range(start_iteration, MAX_TOOL_CALLS):
+            # Resuming mid-iteration: the planner already asked for these sub-agents
+            valid_tcs = pending_tool_calls(messages)
 
-            async for chunk in stream:
-                if not chunk.choices:
-                    continue
-                delta = chunk.choices[0].delta
-
-                if delta.content:
-                    response_text += delta.content
-                    yield {"type": "token", "content": delta.content}
-
-                if delta.tool_calls:
-                    for tc in delta.tool_calls:
-                        while len(tool_calls) <= tc.index:
-                            tool_calls.append({"id": "", "name": "", "arguments": ""})
-                        if tc.id:
-                            tool_calls[tc.index]["id"] = tc.id
-                        if tc.function:
-                            if tc.function.name:
-                                tool_calls[tc.index]["name"] = tc.function.name
-                            if tc.function.arguments:
-                                tool_calls[tc.index]["arguments"] += tc.function.arguments
-
-            if generation:
-                generation.update(output={"response": response_text, "tool_calls": tool_calls})
-                generation.end()
-
-            if not any(tc["name"] for tc in tool_calls):
+            if not valid_tcs:
+                generation = None
                 if trace:
-                    trace.update(output={"response": response_text})
-                    trace.end()
-                return
-
-            assistant_msg = {"role": "assistant", "content": response_text or None}
-            assistant_msg["tool_calls"] = [
-                {
-                    "id": tc["id"],
-                    "type": "function",
-                    "function": {"name": tc["name"], "arguments": tc["arguments"]},
-                }
-                for tc in tool_calls
-                if tc["name"]
-            ]
-            messages.append(assistant_msg)
-
-            # Run all base agents concurrently, streaming events live via queue
-            valid_tcs = [tc for tc in tool_calls if tc["name"]]
+                    generation = trace.start_generation(
+                        name=f"planner-llm-call-{iteration}",
+                        model=model,
+                        input=messages,
+                    )
+
+                response_text = ""
+                tool_calls = []
+
+                async with scheduler.llm.slot():
+                    started_at = time.monotonic()
+                    first_token_at = None
+                    stream = await client.chat.completions.create(
+                        model=model,
+                        messages=apply_cache_control(messages, model),
+                        tools=[RESEARCH_AGENT_TOOL],
+                        stream=True,
+                        stream_options={"include_usage": True},
+                    )
+
+                    usage = None
+                    async for chunk in stream:
+                        if chunk.usage:
+                            usage = parse_usage(chunk.usage)
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta
+                        if first_token_at is None and (delta.content or delta.tool_calls):
+                            first_token_at = time.monotonic()
+
+                        if delta.content:
+                            response_text += delta.content
+                            yield {"type": "token", "content": delta.content}
+
+                        if delta.tool_calls:
+                            for tc in delta.tool_calls:
+                                while len(tool_calls) <= tc.index:
+                                    tool_calls.append({"id": "", "name": "", "arguments": ""})
+                                if tc.id:
+                                    tool_calls[tc.index]["id"] = tc.id
+                                if tc.function:
+                                    if tc.function.name:
+                                        tool_calls[tc.index]["name"] = tc.function.name
+                                    if tc.function.arguments:
+                                        tool_calls[tc.index]["arguments"] += tc.function.arguments
+
+                latency = time.monotonic() - started_at
+                ttft = first_token_at - started_at if first_token_at else None
+                record_llm_call(model, ROLE_PLANNER, ttft, latency, usage)
+
+                outcome = OUTCOME_TOOL_CALLS if any(tc["name"] for tc in tool_calls) else OUTCOME_ANSWER
+                router.record(ROLE_PLANNER, model, latency, usage, outcome)
+
+                if generation:
+                    generation.update(
+                        output={"response": response_text, "tool_calls": tool_calls},
+                        usage_details=usage,
+                    )
+                    generation.end()
+
+                if usage:
+                    logger.info(
+                        f"Planner LLM call {iteration}: input={usage['input_tokens']} "
+                        f"cached={usage['cached_input_tokens']} output={usage['output_tokens']}"
+                    )
+                    yield {"type": "usage", "iteration": iteration, "role": ROLE_PLANNER, "model": model, **usage}
+
+                if outcome == OUTCOME_ANSWER:
+                    if trace:
+                        trace.update(output={"response": response_text})
+                        trace.end()
+                    return
+
+                assistant_msg = {"role": "assistant", "content": response_text or None}
+                assistant_msg["tool_calls"] = [
+                    {
+                        "id": tc["id"],
+                        "type": "function",
+                        "function": {"name": tc["name"], "arguments": tc["arguments"]},
+                    }
+                    for tc in tool_calls
+                    if tc["name"]
+                ]
+                messages.append(assistant_msg)
+                if session:
+                    session.checkpoint(messages, iteration)
+
+                valid_tcs = [tc for tc in tool_calls if tc["name"]]
+
+            # Run all base agents concurrently, streaming events live via queue.
+            # Sub-agents that finished before an interruption are not run again.
+            sub_results = dict(session.subagent_results) if session else {}  # tc_id -> result text
+            to_run = [tc for tc in valid_tcs if tc["id"] not in sub_results]
+            PLANNER_FANOUT.observe(len(to_run))
             queue = asyncio.Queue()
-            sub_results = {}  # tc_id -> result text
 
             async def _run_subagent(tc):
                 tool_input = json.loads(tc["arguments"]) if tc["arguments"] else {}
                 instructions = tool_input.get("instructions", "")
+                budget = get_budget(tool_input.get("effort"))
                 agent_id = tc["id"]
-                await queue.put({"type": "subagent_start", "agent_id": agent_id, "instructions": instructions})
+                await queue.put({
+                    "type": "subagent_start",
+                    "agent_id": agent_id,
+                    "instructions": instructions,
+                    "budget": asdict(budget),
+                })
                 sub_result_text = ""
-                async for event in self.base_agent.run(instructions, parent_span=trace):
+                async for event in self.base_agent.run(instructions, parent_span=trace, budget=budget, session=session):
                     if event["type"] == "token":
                         sub_result_text += event["content"]
                     await queue.put({"type": "subagent_event", "agent_id": agent_id, "event": event})
                 await queue.put({"type": "subagent_end", "agent_id": agent_id, "result": sub_result_text})
                 sub_results[agent_id] = sub_result_text
 
-            tasks = [asyncio.create_task(_run_subagent(tc)) for tc in valid_tcs]
+            tasks = [asyncio.create_task(_run_subagent(tc)) for tc in to_run]
 
-            # Yield events live as they arrive; stop when all tasks finish
-            done_count = 0
-            while done_count < len(valid_tcs):
-                event = await queue.get()
-                if event["type"] == "subagent_end":
-                    done_count += 1
-                yield event
+            try:
+                # Yield events live as they arrive; stop when all tasks finish
+                done_count = 0
+                while done_count < len(to_run):
+                    event = await queue.get()
+                    if event["type"] == "subagent_end":
+                        done_count += 1
+                    # A session saves the result as it records subagent_end, before any consumer sees it
+                    yield event
 
-            await asyncio.gather(*tasks)  # propagate any exceptions
+                await asyncio.gather(*tasks)  # propagate any exceptions
+            finally:
+                # A disconnected client must not leave sub-agents running unobserved
+                for task in tasks:
+                    task.cancel()
 
             for tc in valid_tcs:
                 messages.append({
@@ -158,6 +229,8 @@ class PlannerAgent:
                     "content": sub_results.get(tc["id"], "Agent completed with no text output."),
                 })
                 logger.info(f"Sub-agent result: {sub_results.get(tc['id'], '')[:80]}...")
+            if session:
+                session.checkpoint(messages, iteration + 1)
 
         if trace:
             trace.update(output={"status": "max_iterations"})
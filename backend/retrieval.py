@@ -0,0 +1,138 @@
+import asyncio
+import itertools
+import json
+import socket
+import time
+
+from backend.config import RETRIEVAL_CONNECT_TIMEOUT, RETRIEVAL_SOCKET
+
+# SQL results and embeddings can be large; lines longer than this are a protocol error
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+# How much longer than the query's own timeout a SQL call waits for a reply. The
+# sidecar times queries itself, but not while it is still loading its index
+SQL_RESPONSE_MARGIN = 5.0
+
+
+class RetrievalError(Exception):
+    pass
+
+
+def encode(message: dict) -> bytes:
+    """One JSON object per line; json.dumps never emits a raw newline."""
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+class RetrievalClient:
+    """Client for the retrieval sidecar, shared by every request in a worker.
+
+    Calls are pipelined over one Unix socket connection and matched to their
+    responses by id, so concurrent searches from different requests reach the
+    sidecar together and can be batched there.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._connect_lock = asyncio.Lock()
+
+    async def search(self, query: str, n_results: int) -> dict:
+        """Chroma query results for a single query, in collection.query() shape."""
+        return await self._call("search", query=query, n_results=n_results)
+
+    async def sql(self, query: str, timeout: float) -> tuple[list[str], list[list[str]]]:
+        """Column names and rows, with every value already passed through str()."""
+        try:
+            result = await asyncio.wait_for(self._call("sql", query=query, timeout=timeout), timeout + SQL_RESPONSE_MARGIN)
+        except TimeoutError:
+            # The sidecar's own timeout reply (if any) arrives after this and is dropped
+            raise TimeoutError(f"Query timed out after {timeout:g} seconds") from None
+        return result["columns"], result["rows"]
+
+    async def embed(self, text: str) -> list[float]:
+        return await self._call("embed", text=text)
+
+    async def _call(self, op: str, **params):
+        await self._ensure_connected()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            self._writer.write(encode({"id": request_id, "op": op, "params": params}))
+            await self._writer.drain()
+            response = await future
+        finally:
+            self._pending.pop(request_id, None)
+
+        if "error" in response:
+            if response.get("timeout"):
+                raise TimeoutError(response["error"])
+            raise RetrievalError(response["error"])
+        return response["result"]
+
+    async def _ensure_connected(self) -> None:
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.path, limit=MAX_MESSAGE_BYTES)
+            except OSError as e:
+                raise RetrievalError(f"Retrieval service unavailable at {self.path}: {e}") from e
+            self._reader_task = asyncio.create_task(self._read_responses(reader, self._writer))
+
+    async def _read_responses(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        error = "Retrieval service closed the connection"
+        try:
+            while line := await reader.readline():
+                response = json.loads(line)
+                future = self._pending.get(response["id"])
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except (OSError, ValueError) as e:
+            error = f"Retrieval service connection failed: {e}"
+        finally:
+            # Whatever was in flight is lost; the next call reconnects
+            writer.close()
+            if self._writer is writer:
+                self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(RetrievalError(error))
+
+
+def wait_until_ready(path: str, timeout: float = RETRIEVAL_CONNECT_TIMEOUT) -> None:
+    """Block until the sidecar accepts connections and has loaded its index.
+
+    Used from tool warm-up threads, so it deliberately avoids the event loop.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(path)
+                sock.sendall(encode({"id": 0, "op": "ping", "params": {}}))
+                # The sidecar answers a ping only once its resources are loaded
+                response = json.loads(sock.makefile("rb").readline() or b"{}")
+            if "result" in response:
+                return
+            raise RetrievalError(response.get("error", "No response to ping"))
+        except OSError as e:
+            if time.monotonic() >= deadline:
+                raise RetrievalError(f"Retrieval service unavailable at {path}: {e}") from e
+            time.sleep(0.5)
+
+
+_retrieval_client: RetrievalClient | None = None
+
+
+def get_retrieval_client() -> RetrievalClient | None:
+    """The sidecar client when RETRIEVAL_SOCKET is set, otherwise None (tools run in-process)."""
+    global _retrieval_client
+    if _retrieval_client is not None or not RETRIEVAL_SOCKET:
+        return _retrieval_client
+
+    _retrieval_client = RetrievalClient(RETRIEVAL_SOCKET)
+    return _retrieval_client
@@ -0,0 +1,213 @@
+"""Retrieval sidecar: one process owns the Chroma index and embedding model, and runs DuckDB queries.
+
+API workers reach it over a Unix socket (RETRIEVAL_SOCKET), so several
+uvicorn workers share one copy of the index and model instead of loading
+their own, and the index is only ever built here. Concurrent searches and
+embeddings are batched into a single model call.
+
+    python -m backend.retrieval_server --socket /tmp/themis-retrieval.sock
+    RETRIEVAL_SOCKET=/tmp/themis-retrieval.sock uvicorn backend.main:app --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.config import POOL_SQL_LIMIT, RETRIEVAL_BATCH_MS, RETRIEVAL_MAX_BATCH, RETRIEVAL_SOCKET
+from backend.retrieval import MAX_MESSAGE_BYTES, encode
+
+logger = logging.getLogger(__name__)
+
+
+class Batcher:
+    """Collect calls for up to `window` seconds (or `max_batch` items) and run them as one.
+
+    `run` takes the list of queued items and returns one result per item; it
+    runs on `executor` since model calls block.
+    """
+
+    def __init__(self, run, executor: ThreadPoolExecutor, window: float, max_batch: int):
+        self.run = run
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.items = 0
+        self._queue: list[tuple[object, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((item, future))
+        if len(self._queue) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queue = self._queue, []
+        if batch:
+            asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch: list[tuple[object, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, self.run, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class RetrievalServer:
+    def __init__(self, path: str, window: float, max_batch: int, sql_threads: int):
+        self.path = path
+        self._ready = asyncio.Event()
+        self._collection = None
+        self._embedding_function = None
+        # Chroma and the embedding model get one thread: batches already use the cores
+        self._model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrieval-model")
+        self._sql_executor = ThreadPoolExecutor(max_workers=sql_threads, thread_name_prefix="retrieval-sql")
+        self._search = Batcher(self._search_batch, self._model_executor, window, max_batch)
+        self._embed = Batcher(self._embed_batch, self._model_executor, window, max_batch)
+
+    async def serve(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self._handle, self.path, limit=MAX_MESSAGE_BYTES)
+        logger.info(f"Retrieval service listening on {self.path}")
+
+        # Accept connections straight away; pings wait until this finishes
+        await asyncio.get_running_loop().run_in_executor(self._model_executor, self._load)
+        self._ready.set()
+        logger.info("Retrieval service ready")
+
+        async with server:
+            await server.serve_forever()
+
+    def _load(self) -> None:
+        from backend.embeddings import get_embedding_function
+        from backend.tools.chromadb_tool import _ensure_collection
+
+        self._collection = _ensure_collection()
+        self._embedding_function = get_embedding_function()
+
+    # Connections
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._respond(json.loads(line), writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping retrieval client: {e}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _respond(self, request: dict, writer: asyncio.StreamWriter) -> None:
+        response = {"id": request["id"]}
+        try:
+            response["result"] = await self._dispatch(request["op"], request["params"])
+        except TimeoutError as e:
+            response.update(error=str(e) or "Timed out", timeout=True)
+        except Exception as e:
+            response["error"] = str(e)
+        if not writer.is_closing():
+            writer.write(encode(response))
+            await writer.drain()
+
+    async def _dispatch(self, op: str, params: dict):
+        await self._ready.wait()
+        if op == "ping":
+            return {"search_batches": self._search.batches, "searches": self._search.items}
+        if op == "search":
+            return await self._search.submit((params["query"], params["n_results"]))
+        if op == "embed":
+            return await self._embed.submit(params["text"])
+        if op == "sql":
+            return await self._sql(params["query"], params["timeout"])
+        raise ValueError(f"Unknown op: {op}")
+
+    # Operations
+
+    def _search_batch(self, items: list[tuple[str, int]]) -> list[dict]:
+        # One query call embeds every text in a single batch; each caller gets its own top-n
+        n_max = max(n for _, n in items)
+        results = self._collection.query(query_texts=[query for query, _ in items], n_results=n_max)
+        keys = ("ids", "documents", "metadatas", "distances")
+        return [{key: [results[key][i][:n]] for key in keys} for i, (_, n) in enumerate(items)]
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        return [[float(x) for x in vector] for vector in self._embedding_function(texts)]
+
+    async def _sql(self, query: str, timeout: float) -> dict:
+        # Every query gets its own throwaway connection, as in-process, so no
+        # statement can leave settings, tables or attachments behind for other workers
+        connections = []
+
+        def _run():
+            import duckdb
+
+            from backend.tools.duckdb_tool import check_read_only
+
+            check_read_only(query)
+            conn = duckdb.connect(":memory:")
+            connections.append(conn)
+            try:
+                result = conn.execute(query)
+                columns = [desc[0] for desc in result.description]
+                return {"columns": columns, "rows": [[str(v) for v in row] for row in result.fetchall()]}
+            finally:
+                conn.close()
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._sql_executor, _run)
+        future.add_done_callback(_consume_exception)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        except TimeoutError:
+            # Free the thread instead of letting the runaway scan finish
+            for conn in connections:
+                conn.interrupt()
+            raise TimeoutError(f"Query timed out after {timeout:g} seconds")
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    # An interrupted query's error has already been reported as a timeout
+    if not future.cancelled():
+        future.exception()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared retrieval service for multi-worker deployments.")
+    parser.add_argument("--socket", default=RETRIEVAL_SOCKET or "/tmp/themis-retrieval.sock")
+    parser.add_argument("--batch-ms", type=float, default=RETRIEVAL_BATCH_MS, help="How long to wait to fill a batch.")
+    parser.add_argument("--max-batch", type=int, default=RETRIEVAL_MAX_BATCH)
+    parser.add_argument("--sql-threads", type=int, default=POOL_SQL_LIMIT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    server = RetrievalServer(args.socket, args.batch_ms / 1000, args.max_batch, args.sql_threads)
+    asyncio.run(server.serve())
+
+
+if __name__ == "__main__":
+    main()
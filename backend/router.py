@@ -0,0 +1,77 @@
+import logging
+from dataclasses import asdict, dataclass
+
+from backend.config import ROUTE_ANSWER_MODEL, ROUTE_PLANNER_MODEL, ROUTE_TOOL_SELECTION_MODEL
+
+logger = logging.getLogger(__name__)
+
+# Intermediate BaseAgent turns that only pick the next tool
+ROLE_TOOL_SELECTION = "tool_selection"
+# The BaseAgent turn that writes the sub-agent's final answer
+ROLE_ANSWER = "answer"
+# Every PlannerAgent turn, including the final synthesis
+ROLE_PLANNER = "planner"
+
+OUTCOME_TOOL_CALLS = "tool_calls"
+OUTCOME_ANSWER = "answer"
+# The fast model tried to answer; its draft is dropped and the answer model re-runs the turn
+OUTCOME_DRAFT_DISCARDED = "draft_discarded"
+# The fast model produced unparseable arguments or an unknown tool; the run escalates
+OUTCOME_MALFORMED = "malformed"
+# The turn ran into the research deadline; the run ends with whatever text it had
+OUTCOME_TIMED_OUT = "timed_out"
+
+
+@dataclass
+class RouteStats:
+    calls: int = 0
+    total_latency: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    outcomes: dict[str, int] | None = None
+
+    def to_dict(self) -> dict:
+        stats = asdict(self)
+        stats["avg_latency"] = round(self.total_latency / self.calls, 3) if self.calls else 0.0
+        return stats
+
+
+class ModelRouter:
+    def __init__(self, routes: dict[str, str]):
+        self.routes = routes
+        self._stats: dict[tuple[str, str], RouteStats] = {}
+
+    def model_for(self, role: str) -> str:
+        return self.routes[role]
+
+    def record(self, role: str, model: str, latency: float, usage: dict | None, outcome: str) -> None:
+        stats = self._stats.setdefault((role, model), RouteStats(outcomes={}))
+        stats.calls += 1
+        stats.total_latency += latency
+        if usage:
+            stats.input_tokens += usage["input_tokens"]
+            stats.output_tokens += usage["output_tokens"]
+        stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + 1
+        logger.info(f"Route {role} -> {model}: {outcome} in {latency:.2f}s")
+
+    def stats(self) -> list[dict]:
+        return [
+            {"role": role, "model": model, **stats.to_dict()}
+            for (role, model), stats in self._stats.items()
+        ]
+
+
+_router: ModelRouter | None = None
+
+
+def get_router() -> ModelRouter:
+    global _router
+    if _router is not None:
+        return _router
+
+    _router = ModelRouter({
+        ROLE_TOOL_SELECTION: ROUTE_TOOL_SELECTION_MODEL,
+        ROLE_ANSWER: ROUTE_ANSWER_MODEL,
+        ROLE_PLANNER: ROUTE_PLANNER_MODEL,
+    })
+    return _router
@@ -0,0 +1,253 @@
+import asyncio
+import functools
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from backend.config import (
+    MAX_ACTIVE_REQUESTS,
+    MAX_QUEUED_REQUESTS,
+    POOL_BASH_LIMIT,
+    POOL_LLM_LIMIT,
+    POOL_PDF_LIMIT,
+    POOL_SQL_LIMIT,
+    POOL_VECTOR_LIMIT,
+)
+from backend.metrics import QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+# Which /query request the current task is working for; used for fair queueing
+current_request: ContextVar[str] = ContextVar("current_request", default="default")
+
+# How often a queued request is told its position
+QUEUE_POSITION_INTERVAL = 1.0
+
+
+@dataclass
+class WaitStats:
+    waits: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def record(self, wait: float) -> None:
+        self.waits += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def to_dict(self) -> dict:
+        return {
+            "waits": self.waits,
+            "avg_wait": round(self.total_wait / self.waits, 4) if self.waits else 0.0,
+            "max_wait": round(self.max_wait, 4),
+        }
+
+
+class ResourcePool:
+    """A bounded pool for one kind of work, shared by every request.
+
+    Slots are handed out round-robin across requests, so one request with many
+    pending calls cannot starve the others. Pools for blocking work also own a
+    dedicated thread pool of the same size instead of the default executor.
+    """
+
+    def __init__(self, name: str, limit: int, threaded: bool = False):
+        self.name = name
+        self.limit = limit
+        self.in_use = 0
+        self.stats = WaitStats()
+        self.executor = ThreadPoolExecutor(limit, thread_name_prefix=f"themis-{name}") if threaded else None
+        self._waiters: OrderedDict[str, deque[asyncio.Future]] = OrderedDict()
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._waiters.values())
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def run(self, fn, *args, timeout: float | None = None, on_timeout=None):
+        """Run blocking `fn(*args)` on this pool's threads.
+
+        The slot is held until the call really returns, not just until the
+        caller stops waiting: after a timeout the thread is still busy, and
+        handing its slot to the next caller would leave that caller queued
+        inside the executor while its own timer runs. `on_timeout` is called
+        to cut the work short where the library allows it.
+        """
+        await self._acquire()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, functools.partial(fn, *args))
+        future.add_done_callback(self._release_after)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        except TimeoutError:
+            if on_timeout is not None:
+                on_timeout()
+            raise
+
+    def _release_after(self, future: asyncio.Future) -> None:
+        self._release()
+        # Errors after a timeout have no one left to report to
+        if not future.cancelled():
+            future.exception()
+
+    async def _acquire(self) -> None:
+        started_at = time.monotonic()
+
+        if self.in_use < self.limit and not self._waiters:
+            self.in_use += 1
+        else:
+            request_id = current_request.get()
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.setdefault(request_id, deque()).append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # The slot was handed to us just as we were cancelled
+                    self._release()
+                else:
+                    self._remove_waiter(request_id, future)
+                raise
+
+        wait = time.monotonic() - started_at
+        self.stats.record(wait)
+        QUEUE_WAIT.observe(wait, pool=self.name)
+
+    def _release(self) -> None:
+        # Hand the slot straight to the next request in round-robin order
+        while self._waiters:
+            request_id, queue = next(iter(self._waiters.items()))
+            future = queue.popleft()
+            if queue:
+                self._waiters.move_to_end(request_id)
+            else:
+                del self._waiters[request_id]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_use -= 1
+
+    def _remove_waiter(self, request_id: str, future: asyncio.Future) -> None:
+        queue = self._waiters.get(request_id)
+        if queue and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self._waiters[request_id]
+
+    def snapshot(self) -> dict:
+        return {"limit": self.limit, "in_use": self.in_use, "queued": self.queued, **self.stats.to_dict()}
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class AdmissionController:
+    """Cap concurrent /query runs and reject new ones once the queue is full too."""
+
+    def __init__(self, max_active: int, max_queued: int):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.active = 0
+        self.stats = WaitStats()
+        self._queue: deque[asyncio.Future] = deque()
+
+    @property
+    def full(self) -> bool:
+        """Whether reserve() would reject a request right now."""
+        can_start = self.active < self.max_active and not self._queue
+        return not can_start and len(self._queue) >= self.max_queued
+
+    def reserve(self) -> asyncio.Future:
+        """Take a place in line without awaiting, so rejection happens before streaming starts."""
+        ticket = asyncio.get_running_loop().create_future()
+        if self.active < self.max_active and not self._queue:
+            self.active += 1
+            ticket.set_result(None)
+        elif len(self._queue) < self.max_queued:
+            self._queue.append(ticket)
+        else:
+            raise QueueFullError(f"{self.active} requests running and {len(self._queue)} queued")
+        return ticket
+
+    async def wait(self, ticket: asyncio.Future) -> AsyncIterator[int]:
+        """Yield the ticket's queue position periodically until it is admitted."""
+        started_at = time.monotonic()
+        while not ticket.done():
+            yield self._queue.index(ticket) + 1
+            await asyncio.wait({ticket}, timeout=QUEUE_POSITION_INTERVAL)
+        wait = time.monotonic() - started_at
+        self.stats.record(wait)
+        QUEUE_WAIT.observe(wait, pool="admission")
+
+    def release(self, ticket: asyncio.Future) -> None:
+        if not ticket.done():
+            # Still queued: just leave the line
+            self._queue.remove(ticket)
+            ticket.cancel()
+            return
+
+        while self._queue:
+            waiting = self._queue.popleft()
+            if not waiting.done():
+                waiting.set_result(None)
+                return
+        self.active -= 1
+
+    def snapshot(self) -> dict:
+        return {
+            "max_active": self.max_active,
+            "active": self.active,
+            "max_queued": self.max_queued,
+            "queued": len(self._queue),
+            **self.stats.to_dict(),
+        }
+
+
+class ResourceScheduler:
+    def __init__(self):
+        self.admission = AdmissionController(MAX_ACTIVE_REQUESTS, MAX_QUEUED_REQUESTS)
+        self.llm = ResourcePool("llm", POOL_LLM_LIMIT)
+        self.sql = ResourcePool("sql", POOL_SQL_LIMIT, threaded=True)
+        self.vector = ResourcePool("vector", POOL_VECTOR_LIMIT, threaded=True)
+        self.bash = ResourcePool("bash", POOL_BASH_LIMIT)
+        self.pdf = ResourcePool("pdf", POOL_PDF_LIMIT, threaded=True)
+
+    @property
+    def pools(self) -> list[ResourcePool]:
+        return [self.llm, self.sql, self.vector, self.bash, self.pdf]
+
+    def snapshot(self) -> dict:
+        return {
+            "admission": self.admission.snapshot(),
+            "pools": {pool.name: pool.snapshot() for pool in self.pools},
+        }
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+_scheduler: ResourceScheduler | None = None
+
+
+def get_scheduler() -> ResourceScheduler:
+    global _scheduler
+    if _scheduler is not None:
+        return _scheduler
+
+    _scheduler = ResourceScheduler()
+    return _scheduler
@@ -0,0 +1,392 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from collections.abc import AsyncIterator
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from backend.config import SESSION_DB_PATH, SESSION_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Buffered events are handed to the writer at least this often between checkpoints
+FLUSH_EVERY_EVENTS = 200
+# The writer thread waits this long for another worker's write lock; the event loop never does
+WRITE_LOCK_TIMEOUT = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    input TEXT NOT NULL,
+    status TEXT NOT NULL,
+    planner_messages TEXT,
+    iteration INTEGER NOT NULL DEFAULT 0,
+    checkpoint_seq INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    agent_id TEXT,
+    event TEXT NOT NULL,
+    -- An agent's consecutive tokens share one row: [seq, length] of each; seq is the last one's
+    chunks TEXT,
+    PRIMARY KEY (session_id, seq)
+);
+CREATE TABLE IF NOT EXISTS subagent_results (
+    session_id TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (session_id, agent_id)
+);
+CREATE TABLE IF NOT EXISTS tool_results (
+    session_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (session_id, key)
+);
+"""
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class SessionBusyError(Exception):
+    pass
+
+
+class Session:
+    """Checkpointed state of one planner run.
+
+    The planner saves its messages after every LLM turn and each sub-agent's
+    result as soon as it ends; tool results are saved as they complete. A
+    resumed run restores from the last checkpoint and skips whatever already
+    finished, while clients get the recorded events replayed.
+    """
+
+    def __init__(self, store: "SessionStore", session_id: str, user_input: str, row: dict | None = None):
+        self.store = store
+        self.id = session_id
+        self.input = user_input
+        self.status = row["status"] if row else STATUS_RUNNING
+        self.planner_messages: list[dict] | None = json.loads(row["planner_messages"]) if row and row["planner_messages"] else None
+        self.iteration = row["iteration"] if row else 0
+        self.checkpoint_seq = row["checkpoint_seq"] if row else 0
+        # Events past the checkpoint are replayed for finished runs and dropped by rewind() otherwise
+        self.seq = store._last_seq(session_id) if row else 0
+        self.subagent_results: dict[str, str] = store._subagent_results(session_id) if row else {}
+        # Events not yet handed to the writer, and each agent's token row still growing
+        self._buffer: list[dict] = []
+        self._open_tokens: dict[str | None, dict] = {}
+        self._buffered_events = 0
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        return self.store.db
+
+    # Event log
+
+    def record(self, event: dict) -> None:
+        self.seq += 1
+        agent_id = event.get("agent_id")
+        content = _token_content(event)
+        if content is None:
+            # A structural event ends its agent's token run; a top-level one ends every run
+            if event["type"] == "subagent_event":
+                self._open_tokens.pop(agent_id, None)
+            else:
+                self._open_tokens.clear()
+            self._buffer.append({"seq": self.seq, "agent_id": agent_id, "event": event, "chunks": None})
+        elif agent_id in self._open_tokens:
+            row = self._open_tokens[agent_id]
+            row["content"] += content
+            row["chunks"].append([self.seq, len(content)])
+            row["seq"] = self.seq
+        else:
+            row = {"seq": self.seq, "agent_id": agent_id, "event": event, "content": content, "chunks": [[self.seq, len(content)]]}
+            self._open_tokens[agent_id] = row
+            self._buffer.append(row)
+
+        self._buffered_events += 1
+        if event["type"] == "subagent_end":
+            # Saved here, with the checkpoint covering this event, so a consumer that
+            # stops right after it cannot make a resume run the agent again
+            self.save_subagent_result(event["agent_id"], event["result"])
+        elif self._buffered_events >= FLUSH_EVERY_EVENTS:
+            self.flush()
+
+    async def recorded(self, events: AsyncIterator[dict]) -> AsyncIterator[dict]:
+        try:
+            async for event in events:
+                self.record(event)
+                yield event
+            self.finish(STATUS_DONE)
+        except Exception:
+            self.finish(STATUS_FAILED)
+            raise
+        finally:
+            self.flush()
+
+    async def replay(self, after_seq: int = 0) -> list[tuple[int, dict]]:
+        self.flush()
+        await self.store.flushed()
+        rows = self.db.execute(
+            "SELECT seq, event, chunks FROM events WHERE session_id = ? AND seq > ? AND seq <= ? ORDER BY seq",
+            (self.id, after_seq, self.seq),
+        ).fetchall()
+        replayed = []
+        for seq, event, chunks in rows:
+            event = json.loads(event)
+            if chunks:
+                # The client already has the tokens up to after_seq
+                skip = sum(length for chunk_seq, length in json.loads(chunks) if chunk_seq <= after_seq)
+                if skip:
+                    _set_token_content(event, _token_content(event)[skip:])
+            replayed.append((seq, event))
+        return replayed
+
+    # Checkpoints
+
+    def checkpoint(self, messages: list[dict], iteration: int) -> None:
+        self.planner_messages = messages
+        self.iteration = iteration
+        self.checkpoint_seq = self.seq
+        self.store.write(
+            *self._take_buffer(),
+            (
+                "UPDATE sessions SET planner_messages = ?, iteration = ?, checkpoint_seq = ?, updated_at = ? WHERE id = ?",
+                [(json.dumps(messages), iteration, self.seq, time.time(), self.id)],
+            ),
+        )
+
+    def save_subagent_result(self, agent_id: str, result: str) -> None:
+        self.subagent_results[agent_id] = result
+        # Everything recorded so far, including this agent's events, is now safe to replay
+        self.checkpoint_seq = self.seq
+        self.store.write(
+            *self._take_buffer(),
+            (
+                "INSERT OR REPLACE INTO subagent_results (session_id, agent_id, result) VALUES (?, ?, ?)",
+                [(self.id, agent_id, result)],
+            ),
+            ("UPDATE sessions SET checkpoint_seq = ?, updated_at = ? WHERE id = ?", [(self.seq, time.time(), self.id)]),
+        )
+
+    def rewind(self) -> list[str]:
+        """Drop events past the last checkpoint and from sub-agents that will be re-run.
+
+        Returns the ids of sub-agents that had started but not finished; their
+        partial events are gone and they will start again.
+        """
+        pending = [tc["id"] for tc in pending_tool_calls(self.planner_messages or [])]
+        restarted = [agent_id for agent_id in pending if agent_id not in self.subagent_results]
+        self._take_buffer()
+        self.seq = self.checkpoint_seq
+        self.status = STATUS_RUNNING
+        self.store.write(
+            ("DELETE FROM events WHERE session_id = ? AND seq > ?", [(self.id, self.checkpoint_seq)]),
+            ("DELETE FROM events WHERE session_id = ? AND agent_id = ?", [(self.id, agent_id) for agent_id in restarted]),
+            ("UPDATE sessions SET status = ?, updated_at = ? WHERE id = ?", [(STATUS_RUNNING, time.time(), self.id)]),
+        )
+        return restarted
+
+    def finish(self, status: str) -> None:
+        self.status = status
+        self.store.write(
+            *self._take_buffer(),
+            ("UPDATE sessions SET status = ?, updated_at = ? WHERE id = ?", [(status, time.time(), self.id)]),
+        )
+
+    def flush(self) -> None:
+        """Hand buffered events to the writer thread."""
+        statements = self._take_buffer()
+        if statements:
+            self.store.write(*statements)
+
+    def _take_buffer(self) -> list[tuple[str, list[tuple]]]:
+        rows = []
+        for row in self._buffer:
+            event, chunks = row["event"], None
+            if row["chunks"] is not None:
+                event = _with_token_content(event, row["content"])
+                chunks = json.dumps(row["chunks"])
+            rows.append((self.id, row["seq"], row["agent_id"], json.dumps(event), chunks))
+        self._buffer = []
+        self._open_tokens.clear()
+        self._buffered_events = 0
+        if not rows:
+            return []
+        return [("INSERT INTO events (session_id, seq, agent_id, event, chunks) VALUES (?, ?, ?, ?, ?)", rows)]
+
+    # Tool results, shared by every sub-agent in the session
+
+    def get_tool_result(self, tool_name: str, tool_input: dict) -> dict | None:
+        row = self.db.execute(
+            "SELECT result FROM tool_results WHERE session_id = ? AND key = ?",
+            (self.id, _tool_key(tool_name, tool_input)),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_tool_result(self, tool_name: str, tool_input: dict, result: dict) -> None:
+        self.store.write((
+            "INSERT OR REPLACE INTO tool_results (session_id, key, result) VALUES (?, ?, ?)",
+            [(self.id, _tool_key(tool_name, tool_input), json.dumps(result))],
+        ))
+
+
+def _token_content(event: dict) -> str | None:
+    """The text of a planner or sub-agent token event, None for every other event."""
+    if event["type"] == "token":
+        return event["content"]
+    if event["type"] == "subagent_event" and event["event"]["type"] == "token":
+        return event["event"]["content"]
+    return None
+
+
+def _set_token_content(event: dict, content: str) -> None:
+    if event["type"] == "token":
+        event["content"] = content
+    else:
+        event["event"]["content"] = content
+
+
+def _with_token_content(event: dict, content: str) -> dict:
+    if event["type"] == "token":
+        return {**event, "content": content}
+    return {**event, "event": {**event["event"], "content": content}}
+
+
+def _tool_key(tool_name: str, tool_input: dict) -> str:
+    return f"{tool_name}:{json.dumps(tool_input, sort_keys=True)}"
+
+
+def pending_tool_calls(messages: list[dict]) -> list[dict]:
+    """Tool calls from the last assistant message that have no tool result yet."""
+    if not messages or messages[-1]["role"] != "assistant" or not messages[-1].get("tool_calls"):
+        return []
+    return [
+        {"id": tc["id"], "name": tc["function"]["name"], "arguments": tc["function"]["arguments"]}
+        for tc in messages[-1]["tool_calls"]
+    ]
+
+
+class SessionStore:
+    """SQLite-backed sessions, shared by every request in a worker.
+
+    Reads run on the event loop; they never wait, since WAL readers do not
+    block on writers. Every write goes through one writer thread as a short
+    transaction, so waiting on another worker's write lock never stalls the
+    loop. Writes are queued in order; `flushed()` waits for the queue.
+    """
+
+    def __init__(self, path: str = SESSION_DB_PATH, ttl_seconds: int = SESSION_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.db = _connect(path)
+        self.db.executescript(SCHEMA)
+        _migrate(self.db)
+        self._writer_db = _connect(path, timeout=WRITE_LOCK_TIMEOUT)
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="themis-sessions")
+        self._active: set[str] = set()
+
+    def create(self, user_input: str) -> Session:
+        session_id = uuid.uuid4().hex
+        now = time.time()
+        self._writer.submit(self._prune)
+        self.write((
+            "INSERT INTO sessions (id, input, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            [(session_id, user_input, STATUS_RUNNING, now, now)],
+        ))
+        return Session(self, session_id, user_input)
+
+    async def load(self, session_id: str) -> Session | None:
+        # A run that just ended may still have writes queued
+        await self.flushed()
+        row = self.db.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        return Session(self, session_id, row["input"], dict(row))
+
+    def write(self, *statements: tuple[str, list[tuple]]) -> Future:
+        """Queue (sql, rows) statements to run in one transaction on the writer thread."""
+        return self._writer.submit(self._write, statements)
+
+    async def flushed(self) -> None:
+        await asyncio.wrap_future(self._writer.submit(lambda: None))
+
+    def acquire(self, session: Session) -> None:
+        """Mark a session as streaming; a second client cannot drive it at the same time."""
+        if session.id in self._active:
+            raise SessionBusyError(session.id)
+        self._active.add(session.id)
+
+    def release(self, session: Session) -> None:
+        self._active.discard(session.id)
+
+    def _last_seq(self, session_id: str) -> int:
+        row = self.db.execute("SELECT MAX(seq) FROM events WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] or 0
+
+    def _subagent_results(self, session_id: str) -> dict[str, str]:
+        rows = self.db.execute(
+            "SELECT agent_id, result FROM subagent_results WHERE session_id = ?", (session_id,)
+        ).fetchall()
+        return {row["agent_id"]: row["result"] for row in rows}
+
+    # Writer thread
+
+    def _write(self, statements: tuple[tuple[str, list[tuple]], ...]) -> None:
+        db = self._writer_db
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            for sql, rows in statements:
+                db.executemany(sql, rows)
+            db.execute("COMMIT")
+        except sqlite3.Error:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            logger.exception("Session write failed")
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [(row[0],) for row in self._writer_db.execute("SELECT id FROM sessions WHERE updated_at < ?", (cutoff,))]
+        if expired:
+            self._write(tuple(
+                (f"DELETE FROM {table} WHERE {column} = ?", expired)
+                for table, column in (
+                    ("events", "session_id"),
+                    ("subagent_results", "session_id"),
+                    ("tool_results", "session_id"),
+                    ("sessions", "id"),
+                )
+            ))
+
+
+def _connect(path: str, timeout: float = 5.0) -> sqlite3.Connection:
+    # Autocommit: nothing holds a transaction open between statements
+    db = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+def _migrate(db: sqlite3.Connection) -> None:
+    columns = {row["name"] for row in db.execute("PRAGMA table_info(events)")}
+    if "chunks" not in columns:
+        db.execute("ALTER TABLE events ADD COLUMN chunks TEXT")
+
+
+_session_store: SessionStore | None = None
+
+
+def get_session_store() -> SessionStore:
+    global _session_store
+    if _session_store is not None:
+        return _session_store
+
+    _session_store = SessionStore()
+    return _session_store
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import uuid
+import zlib
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+
+from backend.config import STREAM_COALESCE_MAX_CHARS, STREAM_COALESCE_MS, STREAM_MAX_TOOL_OUTPUT
+
+# Full tool outputs kept for /tool-outputs/{ref} after truncation
+OUTPUT_STORE_MAX_ENTRIES = 512
+# Events read ahead of a slow client before the run itself is paused
+STREAM_READ_AHEAD = 256
+# Marks the end of the run in the coalescing queue
+_END = object()
+# Progress events held back and folded per agent in compact streams; only the latest state matters
+FOLDED_EVENTS = {"usage", "budget"}
+USAGE_COUNTS = ("input_tokens", "cached_input_tokens", "uncached_input_tokens", "output_tokens")
+
+
+class OutputStore:
+    def __init__(self, max_entries: int = OUTPUT_STORE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._outputs: OrderedDict[str, dict] = OrderedDict()
+
+    def put(self, output: dict) -> str:
+        ref = uuid.uuid4().hex[:12]
+        self._outputs[ref] = output
+        while len(self._outputs) > self.max_entries:
+            self._outputs.popitem(last=False)
+        return ref
+
+    def get(self, ref: str) -> dict | None:
+        return self._outputs.get(ref)
+
+
+_output_store: OutputStore | None = None
+
+
+def get_output_store() -> OutputStore:
+    global _output_store
+    if _output_store is not None:
+        return _output_store
+
+    _output_store = OutputStore()
+    return _output_store
+
+
+def _token_key(event: dict) -> tuple[str | None, str] | None:
+    """Return (agent_id, text) for token events, None for everything else."""
+    if event["type"] == "token":
+        return None, event["content"]
+    if event["type"] == "subagent_event" and event["event"]["type"] == "token":
+        return event["agent_id"], event["event"]["content"]
+    return None
+
+
+def _token_event(agent_id: str | None, content: str) -> dict:
+    if agent_id is None:
+        return {"type": "token", "content": content}
+    return {"type": "subagent_event", "agent_id": agent_id, "event": {"type": "token", "content": content}}
+
+
+def _inner(event: dict) -> dict:
+    return event["event"] if event["type"] == "subagent_event" else event
+
+
+def _fold_usage(held: dict | None, event: dict) -> dict:
+    """Sum two usage events from the same agent into one, counting the LLM calls."""
+    if held is None:
+        return event
+    old, new = _inner(held), _inner(event)
+    merged = {**new, **{key: old.get(key, 0) + new.get(key, 0) for key in USAGE_COUNTS}, "calls": old.get("calls", 1) + 1}
+    return {**event, "event": merged} if event["type"] == "subagent_event" else merged
+
+
+def _truncate_tool_output(event: dict, limit: int) -> dict:
+    inner = event["event"]
+    output = inner.get("output") or {}
+    if not any(isinstance(v, str) and len(v) > limit for v in output.values()):
+        return event
+
+    ref = get_output_store().put(output)
+    truncated = {
+        key: value[:limit] + f"\n... (truncated, {len(value)} chars total, full output at /tool-outputs/{ref})"
+        if isinstance(value, str) and len(value) > limit
+        else value
+        for key, value in output.items()
+    }
+    return {**event, "event": {**inner, "output": truncated, "output_ref": ref}}
+
+
+async def coalesce_events(
+    events: AsyncIterator[dict],
+    interval: float = STREAM_COALESCE_MS / 1000,
+    max_chars: int = STREAM_COALESCE_MAX_CHARS,
+    max_tool_output: int = STREAM_MAX_TOOL_OUTPUT,
+) -> AsyncIterator[dict]:
+    """Merge consecutive tokens per agent into frames bounded by time and size.
+
+    Another event from an agent first flushes that agent's tokens, so each
+    agent's tokens stay in order with its tool calls and start/end events;
+    other agents keep buffering. Usage and budget events are held per agent
+    and folded (usage summed, the latest budget kept) into one of each, sent
+    just before the agent's subagent_end, or at the end for the planner.
+    Large tool outputs are truncated, with the full payload kept by reference.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = aiter(events)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_READ_AHEAD)
+    error: Exception | None = None
+    buffers: dict[str | None, str] = {}
+    # When each agent's buffer got its first token; the oldest one sets the next flush
+    opened: dict[str | None, float] = {}
+    held: dict[str | None, dict[str, dict]] = {}
+    buffered_chars = 0
+
+    async def pump():
+        # One task reads the whole run; a task per event costs more than the event
+        nonlocal error
+        try:
+            async for event in iterator:
+                await queue.put(event)
+        except Exception as e:
+            error = e
+        await queue.put(_END)
+
+    def flush(agent_id: str | None) -> list[dict]:
+        nonlocal buffered_chars
+        if agent_id not in buffers:
+            return []
+        content = buffers.pop(agent_id)
+        del opened[agent_id]
+        buffered_chars -= len(content)
+        return [_token_event(agent_id, content)]
+
+    def drain() -> list[dict]:
+        return [frame for agent_id in list(buffers) for frame in flush(agent_id)]
+
+    reader = asyncio.create_task(pump())
+    try:
+        while True:
+            if not queue.empty():
+                event = queue.get_nowait()
+            elif not buffers:
+                event = await queue.get()
+            else:
+                try:
+                    async with asyncio.timeout_at(min(opened.values()) + interval):
+                        event = await queue.get()
+                except TimeoutError:
+                    for frame in drain():
+                        yield frame
+                    continue
+
+            if event is _END:
+                if error is not None:
+                    raise error
+                break
+
+            agent_id = event.get("agent_id")
+            kind = _inner(event)["type"]
+            if kind in FOLDED_EVENTS:
+                agent_held = held.setdefault(agent_id, {})
+                agent_held[kind] = _fold_usage(agent_held.get(kind), event) if kind == "usage" else event
+                continue
+
+            token = _token_key(event)
+            if token is not None:
+                agent_id, content = token
+                if agent_id not in buffers:
+                    opened[agent_id] = loop.time()
+                buffers[agent_id] = buffers.get(agent_id, "") + content
+                buffered_chars += len(content)
+                if buffered_chars >= max_chars:
+                    for frame in drain():
+                        yield frame
+                continue
+
+            for frame in flush(agent_id):
+                yield frame
+            if event["type"] == "subagent_end":
+                for frame in held.pop(agent_id, {}).values():
+                    yield frame
+            if event["type"] == "subagent_event" and event["event"]["type"] == "tool_end":
+                event = _truncate_tool_output(event, max_tool_output)
+            yield event
+
+        for frame in drain():
+            yield frame
+        for agent_held in held.values():
+            for frame in agent_held.values():
+                yield frame
+    finally:
+        reader.cancel()
+        # The generator cannot be closed while the reader is still inside it
+        await asyncio.gather(reader, return_exceptions=True)
+        await iterator.aclose()
+
+
+def sse_frame(event: dict, compact: bool = False, event_id: int | None = None) -> str:
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    if compact:
+        return f"{prefix}data: {json.dumps(event, separators=(',', ':'))}\n\n"
+    return f"{prefix}data: {json.dumps(event)}\n\n"
+
+
+class GzipStream:
+    """Incremental gzip with a sync flush after every frame so the client never waits on the compressor."""
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(wbits=31)
+
+    def frame(self, text: str) -> bytes:
+        return self._compressor.compress(text.encode()) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def close(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
@@ -1,7 +1,12 @@
+import functools
+import json
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import Any
 
+from backend.metrics import TOOL_CALLS, TOOL_DURATION, TOOL_OUTPUT_BYTES
+
 
 @dataclass
 class ToolRequest:
@@ -19,6 +24,12 @@ class BaseTool(ABC):
     name: str
     description: str
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Time every concrete tool's execute, however it is called
+        if "execute" in cls.__dict__:
+            cls.execute = _instrumented(cls.execute)
+
     @abstractmethod
     def get_schema(self) -> dict:
         """Return tool schema in OpenAI function-calling format."""
@@ -26,3 +37,28 @@ class BaseTool(ABC):
     @abstractmethod
     async def execute(self, request: ToolRequest) -> ToolResponse:
         """Execute the tool and return a response."""
+
+    def warm_up(self) -> None:
+        """Load heavy dependencies and long-lived resources ahead of the first call.
+
+        Tools import their libraries lazily so the backend starts fast; this
+        runs in a worker thread at startup and is safe to skip.
+        """
+
+
+def _instrumented(execute):
+    @functools.wraps(execute)
+    async def wrapper(self: BaseTool, request: ToolRequest) -> ToolResponse:
+        started_at = time.monotonic()
+        # Stays "error" if execute raises or is cancelled (e.g. by the research deadline)
+        success = "error"
+        try:
+            response = await execute(self, request)
+            success = str(response.success).lower()
+            TOOL_OUTPUT_BYTES.observe(len(json.dumps(response.data)), tool=self.name)
+            return response
+        finally:
+            TOOL_DURATION.observe(time.monotonic() - started_at, tool=self.name)
+            TOOL_CALLS.inc(tool=self.name, success=success)
+
+    return wrapper
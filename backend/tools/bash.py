@@ -1,6 +1,10 @@
 import asyncio
+import contextlib
+import os
+import signal
 
 from backend.config import DATA_DIR
+from backend.scheduler import get_scheduler
 from backend.tools.base import BaseTool, ToolRequest, ToolResponse
 
 # Commands the agent is allowed to run
@@ -51,29 +55,37 @@ class BashTool(BaseTool):
                 error=f"Command rejected: must only access {DATA_DIR} using allowed commands: {ALLOWED_COMMANDS}",
             )
 
-        proc = await asyncio.create_subprocess_shell(
-            command,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            cwd=DATA_DIR,
-        )
-
-        try:
-            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=20)
-        except TimeoutError:
-            proc.kill()
-            await proc.wait()
-            return ToolResponse(
-                success=False,
-                data={},
-                error=(
-                    "Command timed out after 20 seconds. Your query is too broad — "
-                    "narrow it down by targeting a specific partition "
-                    "(e.g. year=YYYY/court=XX_YY/bench=NAME/*.json) instead of scanning everything. "
-                    "Try a lighter, more targeted command."
-                ),
+        async with get_scheduler().bash.slot():
+            proc = await asyncio.create_subprocess_shell(
+                command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=DATA_DIR,
+                # Its own process group, so a pipeline can be killed along with the shell
+                start_new_session=True,
             )
 
+            try:
+                stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=20)
+            except TimeoutError:
+                return ToolResponse(
+                    success=False,
+                    data={},
+                    error=(
+                        "Command timed out after 20 seconds. Your query is too broad — "
+                        "narrow it down by targeting a specific partition "
+                        "(e.g. year=YYYY/court=XX_YY/bench=NAME/*.json) instead of scanning everything. "
+                        "Try a lighter, more targeted command."
+                    ),
+                )
+            finally:
+                # Also when cancelled (research deadline, client gone): the slot must not
+                # be released while the command still runs
+                if proc.returncode is None:
+                    with contextlib.suppress(ProcessLookupError):
+                        os.killpg(proc.pid, signal.SIGKILL)
+                    await proc.wait()
+
         output = stdout.decode()
         if len(output) > MAX_OUTPUT_LENGTH:
             output = output[:MAX_OUTPUT_LENGTH] + f"\n... (truncated, {len(stdout.decode())} chars total)"
@@ -1,22 +1,41 @@
 import asyncio
-import functools
-
-import chromadb
-import duckdb
+import threading
+from typing import TYPE_CHECKING
 
+from backend.config import CASES_DB_PATH, CHROMA_DIR
+from backend.retrieval import get_retrieval_client, wait_until_ready
+from backend.scheduler import get_scheduler
 from backend.tools.base import BaseTool, ToolRequest, ToolResponse
 
-CASES_DB_PATH = "/Users/atharva/workspace/code/projects/buildindia/cases.db"
-CHROMA_DIR = "/Users/atharva/workspace/code/projects/buildindia/chroma_db"
+if TYPE_CHECKING:
+    import chromadb
+
 COLLECTION_NAME = "cases"
 
 MAX_OUTPUT_LENGTH = 10000
 
+_collection: "chromadb.Collection | None" = None
+# Only one thread may build a missing index
+_collection_lock = threading.Lock()
+
 
-def _ensure_collection() -> chromadb.Collection:
+def _ensure_collection() -> "chromadb.Collection":
     """Return the cases collection, building the index from DuckDB on first run."""
+    global _collection
+    with _collection_lock:
+        if _collection is None:
+            _collection = _load_collection()
+        return _collection
+
+
+def _load_collection() -> "chromadb.Collection":
+    import chromadb
+    import duckdb
+
+    from backend.embeddings import get_embedding_function
+
     client = chromadb.PersistentClient(path=CHROMA_DIR)
-    collection = client.get_or_create_collection(COLLECTION_NAME)
+    collection = client.get_or_create_collection(COLLECTION_NAME, embedding_function=get_embedding_function())
 
     if collection.count() > 0:
         return collection
@@ -85,6 +104,16 @@ class ChromaDBTool(BaseTool):
             },
         }
 
+    def warm_up(self) -> None:
+        retrieval = get_retrieval_client()
+        if retrieval:
+            # The sidecar owns (and if needed builds) the index
+            wait_until_ready(retrieval.path)
+            return
+
+        # Also builds the index if it is missing, instead of on the first search
+        _ensure_collection()
+
     async def execute(self, request: ToolRequest) -> ToolResponse:
         query = request.parameters.get("query", "")
         n_results = min(request.parameters.get("n_results", 10), 30)
@@ -96,12 +125,14 @@ class ChromaDBTool(BaseTool):
             collection = _ensure_collection()
             return collection.query(query_texts=[q], n_results=n)
 
+        pool = get_scheduler().vector
+        retrieval = get_retrieval_client()
         try:
-            loop = asyncio.get_running_loop()
-            results = await asyncio.wait_for(
-                loop.run_in_executor(None, functools.partial(_search, query, n_results)),
-                timeout=30,
-            )
+            if retrieval:
+                # The sidecar batches concurrent searches, so they are not capped per worker
+                results = await asyncio.wait_for(retrieval.search(query, n_results), timeout=30)
+            else:
+                results = await pool.run(_search, query, n_results, timeout=30)
         except TimeoutError:
             return ToolResponse(success=False, data={}, error="Search timed out after 30 seconds.")
         except Exception as e:
@@ -1,13 +1,27 @@
-import asyncio
-import functools
-
-import duckdb
-
 from backend.config import DATA_DIR
+from backend.retrieval import get_retrieval_client, wait_until_ready
+from backend.scheduler import get_scheduler
 from backend.tools.base import BaseTool, ToolRequest, ToolResponse
 
 MAX_OUTPUT_LENGTH = 10000
 
+READ_ONLY_STATEMENT_TYPES = ("SELECT", "EXPLAIN")
+
+
+def check_read_only(query: str) -> None:
+    """Raise ValueError unless `query` is exactly one read-only statement.
+
+    DuckDB runs every statement in a multi-statement string, so the first-word
+    check alone would let `SELECT 1; SET ...` or `SELECT 1; ATTACH ...` through.
+    """
+    import duckdb
+
+    statements = duckdb.extract_statements(query)
+    if len(statements) != 1:
+        raise ValueError("Run exactly one SQL statement per query")
+    if statements[0].type.name not in READ_ONLY_STATEMENT_TYPES:
+        raise ValueError("Only read-only queries are allowed")
+
 
 class DuckDBTool(BaseTool):
     name = "sql"
@@ -40,6 +54,16 @@ class DuckDBTool(BaseTool):
             },
         }
 
+    def warm_up(self) -> None:
+        retrieval = get_retrieval_client()
+        if retrieval:
+            wait_until_ready(retrieval.path)
+            return
+
+        import duckdb
+
+        duckdb.connect(":memory:").close()
+
     async def execute(self, request: ToolRequest) -> ToolResponse:
         query = request.parameters.get("query", "")
 
@@ -51,20 +75,35 @@ class DuckDBTool(BaseTool):
         if first_word not in ("SELECT", "DESCRIBE", "SHOW", "EXPLAIN", "WITH", "FROM"):
             return ToolResponse(success=False, data={}, error="Only read-only queries are allowed")
 
+        connections = []
+
         def _run_query(q: str):
+            import duckdb
+
+            check_read_only(q)
             conn = duckdb.connect(":memory:")
-            result = conn.execute(q)
-            columns = [desc[0] for desc in result.description]
-            rows = result.fetchall()
-            conn.close()
+            connections.append(conn)
+            try:
+                result = conn.execute(q)
+                columns = [desc[0] for desc in result.description]
+                rows = result.fetchall()
+            finally:
+                conn.close()
             return columns, rows
 
+        def _interrupt():
+            # Stop the scan so the thread (and its pool slot) is freed promptly
+            for conn in connections:
+                conn.interrupt()
+
+        pool = get_scheduler().sql
+        retrieval = get_retrieval_client()
         try:
-            loop = asyncio.get_running_loop()
-            columns, rows = await asyncio.wait_for(
-                loop.run_in_executor(None, functools.partial(_run_query, query)),
-                timeout=20,
-            )
+            if retrieval:
+                async with pool.slot():
+                    columns, rows = await retrieval.sql(query, timeout=20)
+            else:
+                columns, rows = await pool.run(_run_query, query, timeout=20, on_timeout=_interrupt)
         except TimeoutError:
             return ToolResponse(
                 success=False,
@@ -1,10 +1,8 @@
+import functools
 import tempfile
 
-import boto3
-import fitz
-from botocore import UNSIGNED
-from botocore.config import Config
-
+from backend.config import S3_ENDPOINT_URL
+from backend.scheduler import get_scheduler
 from backend.tools.base import BaseTool, ToolRequest, ToolResponse
 
 S3_BUCKET = "indian-high-court-judgments"
@@ -13,6 +11,36 @@ S3_REGION = "ap-south-1"
 MAX_OUTPUT_LENGTH = 50000
 
 
+@functools.cache
+def _s3_client():
+    # boto3 clients are thread-safe, so the PDF pool shares one
+    import boto3
+    from botocore import UNSIGNED
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        region_name=S3_REGION,
+        endpoint_url=S3_ENDPOINT_URL,
+        config=Config(signature_version=UNSIGNED, s3={"addressing_style": "path"} if S3_ENDPOINT_URL else None),
+    )
+
+
+def _download_and_extract(s3_key: str) -> tuple[str, int]:
+    import fitz
+
+    s3 = _s3_client()
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+        s3.download_file(S3_BUCKET, s3_key, tmp.name)
+        doc = fitz.open(tmp.name)
+        text = "\n".join(page.get_text() for page in doc)
+        page_count = len(doc)
+        doc.close()
+
+    return text, page_count
+
+
 class PDFTool(BaseTool):
     name = "read_pdf"
     description = (
@@ -44,6 +72,11 @@ class PDFTool(BaseTool):
             },
         }
 
+    def warm_up(self) -> None:
+        import fitz  # loads MuPDF
+
+        _s3_client()
+
     async def execute(self, request: ToolRequest) -> ToolResponse:
         s3_key = request.parameters.get("s3_key", "")
 
@@ -53,20 +86,10 @@ class PDFTool(BaseTool):
         if not s3_key.endswith(".pdf"):
             return ToolResponse(success=False, data={}, error="s3_key must end with .pdf")
 
+        # Download and parsing block, so they run on the PDF pool's threads
+        pool = get_scheduler().pdf
         try:
-            s3 = boto3.client(
-                "s3",
-                region_name=S3_REGION,
-                config=Config(signature_version=UNSIGNED),
-            )
-
-            with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
-                s3.download_file(S3_BUCKET, s3_key, tmp.name)
-                doc = fitz.open(tmp.name)
-                text = "\n".join(page.get_text() for page in doc)
-                page_count = len(doc)
-                doc.close()
-
+            text, page_count = await pool.run(_download_and_extract, s3_key)
         except Exception as e:
             return ToolResponse(success=False, data={}, error=str(e))
 
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+import time
+
+from backend.tools.base import BaseTool
+
+logger = logging.getLogger(__name__)
+
+STATUS_COLD = "cold"
+STATUS_WARMING = "warming"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+
+class ToolRegistry:
+    """Tools by name, with their warm-up state.
+
+    Tool modules defer importing chromadb, duckdb, boto3 and fitz until first
+    use, so building the registry is cheap. warm_up() loads them in worker
+    threads, usually as a background task at startup. A tool whose warm-up
+    fails stays usable and retries on its first call.
+    """
+
+    def __init__(self, tools: list[BaseTool]):
+        self.tools = {tool.name: tool for tool in tools}
+        self._state = {name: {"status": STATUS_COLD} for name in self.tools}
+
+    def list(self) -> list[BaseTool]:
+        return list(self.tools.values())
+
+    async def warm_up(self) -> None:
+        await asyncio.gather(*(self._warm_up(tool) for tool in self.tools.values()))
+
+    async def _warm_up(self, tool: BaseTool) -> None:
+        state = self._state[tool.name]
+        state["status"] = STATUS_WARMING
+        started_at = time.monotonic()
+        try:
+            await asyncio.to_thread(tool.warm_up)
+        except Exception as e:
+            logger.warning(f"Warm-up of {tool.name} failed: {e}")
+            state.update(status=STATUS_FAILED, error=str(e))
+        else:
+            state["status"] = STATUS_READY
+        state["seconds"] = round(time.monotonic() - started_at, 3)
+
+    @property
+    def warmed(self) -> bool:
+        return all(state["status"] in (STATUS_READY, STATUS_FAILED) for state in self._state.values())
+
+    def snapshot(self) -> dict:
+        return {name: dict(state) for name, state in self._state.items()}
@@ -1,11 +1,14 @@
-from langfuse import Langfuse
+from typing import TYPE_CHECKING
 
 from backend.config import LANGFUSE_SECRET_KEY, LANGFUSE_PUBLIC_KEY, LANGFUSE_HOST
 
-_langfuse: Langfuse | None = None
+if TYPE_CHECKING:
+    from langfuse import Langfuse
 
+_langfuse: "Langfuse | None" = None
 
-def get_langfuse() -> Langfuse | None:
+
+def get_langfuse() -> "Langfuse | None":
     global _langfuse
     if _langfuse is not None:
         return _langfuse
@@ -13,6 +16,8 @@ def get_langfuse() -> Langfuse | None:
     if not LANGFUSE_SECRET_KEY or not LANGFUSE_PUBLIC_KEY:
         return None
 
+    from langfuse import Langfuse
+
     _langfuse = Langfuse(
         secret_key=LANGFUSE_SECRET_KEY,
         public_key=LANGFUSE_PUBLIC_KEY,
@@ -0,0 +1,189 @@
+"""Synthetic court data shaped like the production corpus.
+
+Generates partitioned case JSON (data/json/year=/court=/bench=/CNR.json), a
+DuckDB cases.db for building the Chroma index, and judgment PDFs laid out
+under a local S3 stand-in directory (s3/BUCKET/data/pdf/...).
+
+    python -m benchmarks.fixtures /tmp/themis-fixture --files 10000
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+
+import duckdb
+import fitz
+
+S3_BUCKET = "indian-high-court-judgments"
+
+YEARS = list(range(2015, 2025))
+COURTS = [
+    ("27_1", ["bombayhc_pg", "bombayhc_ngp", "bombayhc_aur"]),
+    ("7_26", ["delhihc_pg"]),
+    ("33_10", ["madrashc_pg", "madrashc_mdu"]),
+    ("19_16", ["calcuttahc_pg", "calcuttahc_jpg"]),
+    ("29_3", ["karnatakahc_pg", "karnatakahc_dwd"]),
+    ("11_24", ["sikkimhc_pg"]),
+]
+
+CASE_TYPES = ["BAIL APPLN", "CRL.A", "W.P.(C)", "CRL.M.C", "RFA", "FAO", "MAT.APP", "CS(COMM)"]
+SUBJECTS = [
+    "bail for a first-time offender under the NDPS Act",
+    "anticipatory bail in a cheating case",
+    "murder conviction under section 302 IPC",
+    "property dispute over illegal occupation of an ancestral home",
+    "eviction of a tenant for non-payment of rent",
+    "divorce on grounds of cruelty and custody of children",
+    "dishonour of cheque under section 138 NI Act",
+    "land acquisition compensation enhancement",
+    "service matter challenging dismissal from government employment",
+    "quashing of FIR in a matrimonial dispute",
+]
+DISPOSALS = ["Allowed", "Dismissed", "Disposed Off", "Withdrawn", "Partly Allowed", "Bail Granted", "Bail Rejected"]
+FIRST_NAMES = ["Ramesh", "Sunita", "Arjun", "Priya", "Mohammed", "Lakshmi", "Harpreet", "Anil", "Kavita", "Joseph"]
+LAST_NAMES = ["Sharma", "Patel", "Reddy", "Singh", "Khan", "Iyer", "Das", "Nair", "Gupta", "Fernandes"]
+JUDGES = [
+    "HON'BLE MR. JUSTICE A. K. MENON",
+    "HON'BLE MS. JUSTICE R. BANSAL",
+    "HON'BLE MR. JUSTICE S. CHANDRASEKHAR",
+    "HON'BLE MRS. JUSTICE P. DESAI",
+    "HON'BLE MR. JUSTICE V. K. RAO",
+    "HON'BLE MR. JUSTICE M. QURESHI",
+]
+
+
+def partitions() -> list[tuple[int, str, str]]:
+    return [(year, court, bench) for year in YEARS for court, benches in COURTS for bench in benches]
+
+
+def _name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def make_case(rng: random.Random, index: int, year: int, court: str, bench: str) -> dict:
+    state = court.split("_")[0].zfill(2)
+    cnr = f"{bench[:4].upper()}{state}{index:08d}{year}"
+    subject = rng.choice(SUBJECTS)
+    petitioner, respondent = _name(rng), _name(rng)
+    filename = f"{cnr}_1_{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}.pdf"
+    return {
+        "cnr": cnr,
+        "title": f"{rng.choice(CASE_TYPES)}/{index % 9000 + 1}/{year} {petitioner} vs {respondent}",
+        "description": f"Petition concerning {subject}.",
+        "judge": rng.choice(JUDGES),
+        "court": court,
+        "bench": bench,
+        "year": year,
+        "date_of_registration": f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "decision_date": f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "disposal_nature": rng.choice(DISPOSALS),
+        "pdf_link": f"court/cnrorders/{bench}/orders/{filename}",
+        "pdf_key": f"data/pdf/year={year}/court={court}/bench={bench}/{filename}",
+        "body_text": (
+            f"The petitioner {petitioner} has approached this Court seeking relief in a matter of {subject}. "
+            f"Learned counsel for the respondent {respondent} opposed the petition. "
+            f"Having heard both sides, the petition is {rng.choice(DISPOSALS).lower()}."
+        ),
+    }
+
+
+def write_pdf(path: Path, case: dict, pages: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        text = f"{case['title']}\n{case['judge']}\nPage {page_number + 1}\n\n" + (case["body_text"] + "\n") * 12
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), text, fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def generate(
+    root: Path,
+    files: int = 2000,
+    indexed: int = 2000,
+    pdfs: int = 20,
+    pdf_pages: int = 5,
+    seed: int = 0,
+) -> dict:
+    """Write a fixture under root and return its manifest (also saved as manifest.json).
+
+    files: number of case JSON files, spread round-robin across partitions
+    indexed: how many of those cases go into cases.db for the Chroma index
+    pdfs: how many cases get a real judgment PDF in the S3 stand-in
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    data_dir = root / "data"
+    s3_dir = root / "s3"
+    parts = partitions()
+
+    indexed_rows = []
+    pdf_keys = []
+    used_partitions = set()
+    for index in range(files):
+        year, court, bench = parts[index % len(parts)]
+        partition = f"year={year}/court={court}/bench={bench}"
+        case = make_case(rng, index, year, court, bench)
+
+        out = data_dir / "json" / partition / f"{case['cnr']}.json"
+        if partition not in used_partitions:
+            out.parent.mkdir(parents=True, exist_ok=True)
+            used_partitions.add(partition)
+        out.write_text(json.dumps(case))
+
+        if index < indexed:
+            indexed_rows.append(
+                (case["cnr"], case["title"], case["judge"], case["disposal_nature"], case["body_text"], court)
+            )
+        if index < pdfs:
+            write_pdf(s3_dir / S3_BUCKET / case["pdf_key"], case, pdf_pages)
+            pdf_keys.append(case["pdf_key"])
+
+    cases_db = root / "cases.db"
+    cases_db.unlink(missing_ok=True)
+    db = duckdb.connect(str(cases_db))
+    db.execute(
+        "CREATE TABLE cases (cnr VARCHAR, title VARCHAR, judge VARCHAR, disposal VARCHAR, "
+        "body_text VARCHAR, court_name VARCHAR)"
+    )
+    db.executemany("INSERT INTO cases VALUES (?, ?, ?, ?, ?, ?)", indexed_rows)
+    db.close()
+
+    manifest = {
+        "root": str(root),
+        "data_dir": str(data_dir),
+        "cases_db": str(cases_db),
+        "chroma_dir": str(root / "chroma_db"),
+        "s3_dir": str(s3_dir),
+        "s3_bucket": S3_BUCKET,
+        "files": files,
+        "indexed": len(indexed_rows),
+        "partitions": sorted(used_partitions),
+        "pdf_keys": pdf_keys,
+        "subjects": SUBJECTS,
+    }
+    (root / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def load_manifest(root: Path) -> dict:
+    return json.loads((Path(root) / "manifest.json").read_text())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Themis court-data fixture.")
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--indexed", type=int, default=2000)
+    parser.add_argument("--pdfs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    manifest = generate(args.root, files=args.files, indexed=args.indexed, pdfs=args.pdfs, seed=args.seed)
+    print(f"Wrote {manifest['files']} cases across {len(manifest['partitions'])} partitions to {args.root}")
+
+
+if __name__ == "__main__":
+    main()
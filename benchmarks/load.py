@@ -0,0 +1,281 @@
+"""End-to-end load benchmark for /query, fully offline.
+
+By default this builds a synthetic fixture, starts the mock OpenRouter/S3
+server and a backend pointed at both, then drives /query at the requested
+concurrency and reports latency percentiles, event throughput and backend
+peak memory:
+
+    python -m benchmarks.load --concurrency 8 --requests 40 --output report.json
+
+Pass --url to drive an already-running backend instead.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fixtures import generate
+from benchmarks.mock_openrouter import add_script_arguments
+
+ROOT = Path(__file__).resolve().parent.parent
+
+QUERIES = [
+    "What are the chances of bail for a first-time NDPS offender in Delhi HC?",
+    "How do Bombay HC benches rule on eviction of tenants for non-payment of rent?",
+    "Find precedents on quashing FIRs in matrimonial disputes.",
+    "How long do cheque dishonour cases under section 138 take to be decided?",
+    "Which judges have heard land acquisition compensation appeals recently?",
+]
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss_mb(pid: int) -> float | None:
+    """Peak resident memory of a process (Linux only)."""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def tree_peak_rss_mb(pid: int) -> float | None:
+    """Summed peak memory of a process and its descendants, e.g. uvicorn and its workers."""
+    total = peak_rss_mb(pid)
+    if total is None:
+        return None
+    for children in Path(f"/proc/{pid}/task").glob("*/children"):
+        for child in children.read_text().split():
+            total += tree_peak_rss_mb(int(child)) or 0
+    return round(total, 1)
+
+
+async def run_query(client: httpx.AsyncClient, url: str, body: dict) -> dict:
+    started_at = time.monotonic()
+    result = {"status": None, "events": 0, "bytes": 0, "first_event": None, "first_token": None, "latency": None}
+
+    async with client.stream("POST", f"{url}/query", json=body) as response:
+        result["status"] = response.status_code
+        if response.status_code != 200:
+            await response.aread()
+            return result
+
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            now = time.monotonic() - started_at
+            result["events"] += 1
+            if result["first_event"] is None:
+                result["first_event"] = now
+            if result["first_token"] is None and ('"type": "token"' in line or '"type":"token"' in line):
+                result["first_token"] = now
+
+        # Bytes on the wire, i.e. after any gzip
+        result["bytes"] = response.num_bytes_downloaded
+
+    result["latency"] = time.monotonic() - started_at
+    return result
+
+
+async def drive(url: str, concurrency: int, requests: int, compact: bool = False, gzip: bool = False) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> dict:
+        async with semaphore:
+            try:
+                body = {"input": QUERIES[i % len(QUERIES)], "compact": compact, "gzip": gzip}
+                return await run_query(client, url, body)
+            except httpx.HTTPError as e:
+                return {"status": None, "error": str(e), "events": 0, "bytes": 0}
+
+    async with httpx.AsyncClient(timeout=httpx.Timeout(None)) as client:
+        started_at = time.monotonic()
+        results = await asyncio.gather(*(one(i) for i in range(requests)))
+        wall = time.monotonic() - started_at
+
+    ok = [r for r in results if r["status"] == 200 and r.get("latency") is not None]
+    events = sum(r["events"] for r in results)
+    return {
+        "concurrency": concurrency,
+        "compact": compact,
+        "gzip": gzip,
+        "requests": requests,
+        "completed": len(ok),
+        "rejected": sum(1 for r in results if r["status"] == 429),
+        "errors": sum(1 for r in results if r["status"] not in (200, 429)),
+        "wall_seconds": round(wall, 3),
+        "requests_per_second": round(len(ok) / wall, 3) if wall else None,
+        "latency_seconds": summarize([r["latency"] for r in ok]),
+        "first_event_seconds": summarize([r["first_event"] for r in ok if r["first_event"] is not None]),
+        "first_token_seconds": summarize([r["first_token"] for r in ok if r["first_token"] is not None]),
+        "events_total": events,
+        "events_per_second": round(events / wall, 1) if wall else None,
+        "events_per_answer": round(events / len(ok), 1) if ok else None,
+        "bytes_per_answer": round(sum(r["bytes"] for r in ok) / len(ok)) if ok else None,
+    }
+
+
+def wait_for(url: str, proc: subprocess.Popen, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{proc.args} exited with {proc.returncode}")
+        try:
+            httpx.get(url, timeout=1).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise TimeoutError(f"{url} did not come up within {timeout}s")
+
+
+def backend_env(manifest: dict, mock_url: str, extra: dict[str, str]) -> dict[str, str]:
+    env = {
+        **os.environ,
+        "OPENROUTER_BASE_URL": f"{mock_url}/api/v1",
+        "OPENROUTER_API_KEY": "mock",
+        "DATA_DIR": manifest["data_dir"],
+        "CASES_DB_PATH": manifest["cases_db"],
+        "CHROMA_DIR": manifest["chroma_dir"],
+        "EMBEDDING_FUNCTION": "hash",
+        "S3_ENDPOINT_URL": f"{mock_url}/s3",
+        "AWS_ACCESS_KEY_ID": "mock",
+        "AWS_SECRET_ACCESS_KEY": "mock",
+        # Empty values win over backend/.env, keeping tracing off
+        "LANGFUSE_SECRET_KEY": "",
+        "LANGFUSE_PUBLIC_KEY": "",
+        "PYTHONPATH": str(ROOT),
+    }
+    env.update(extra)
+    return env
+
+
+def run_stack(args: argparse.Namespace) -> dict:
+    fixture = args.fixture or Path(tempfile.mkdtemp(prefix="themis-bench-"))
+    if not (fixture / "manifest.json").exists():
+        print(f"Generating fixture in {fixture} ...", file=sys.stderr)
+        generate(fixture, files=args.files, indexed=args.indexed, pdfs=args.pdfs)
+    manifest = json.loads((fixture / "manifest.json").read_text())
+
+    mock_port, backend_port = free_port(), free_port()
+    mock_url, backend_url = f"http://127.0.0.1:{mock_port}", f"http://127.0.0.1:{backend_port}"
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    env = backend_env(manifest, mock_url, extra_env)
+
+    # Build the Chroma index up front so the first request does not pay for it
+    subprocess.run(
+        [sys.executable, "-c", "from backend.tools.chromadb_tool import _ensure_collection; _ensure_collection()"],
+        env=env,
+        cwd=ROOT,
+        check=True,
+    )
+
+    mock_cmd = [
+        sys.executable, "-m", "benchmarks.mock_openrouter", str(fixture), "--port", str(mock_port),
+        "--ttft-ms", str(args.ttft_ms), "--token-ms", str(args.token_ms), "--agent-steps", str(args.agent_steps),
+        "--fanout", str(args.fanout), "--answer-tokens", str(args.answer_tokens),
+    ]
+    backend_cmd = [
+        sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(backend_port), "--log-level", "warning",
+        "--workers", str(args.workers),
+    ]
+
+    procs = []
+    sidecar = None
+    if args.sidecar:
+        env["RETRIEVAL_SOCKET"] = str(fixture / "retrieval.sock")
+        sidecar = subprocess.Popen(
+            [sys.executable, "-m", "backend.retrieval_server", "--socket", env["RETRIEVAL_SOCKET"]], env=env, cwd=ROOT
+        )
+        procs.append(sidecar)
+    mock = subprocess.Popen(mock_cmd, env=env, cwd=ROOT)
+    backend = subprocess.Popen(backend_cmd, env=env, cwd=ROOT)
+    procs += [mock, backend]
+    try:
+        wait_for(f"{mock_url}/docs", mock)
+        # Ready means tools are warmed up, so the first requests are not measuring imports
+        wait_for(f"{backend_url}/health/ready", backend)
+
+        report = asyncio.run(drive(backend_url, args.concurrency, args.requests, args.compact, args.gzip))
+        report["backend_peak_rss_mb"] = tree_peak_rss_mb(backend.pid)
+        report["workers"] = args.workers
+        if sidecar:
+            report["sidecar_peak_rss_mb"] = tree_peak_rss_mb(sidecar.pid)
+        report["fixture"] = {"root": str(fixture), "files": manifest["files"], "indexed": manifest["indexed"]}
+        report["mock"] = {
+            "ttft_ms": args.ttft_ms,
+            "token_ms": args.token_ms,
+            "agent_steps": args.agent_steps,
+            "fanout": args.fanout,
+            "answer_tokens": args.answer_tokens,
+        }
+        report["env"] = extra_env
+        return report
+    finally:
+        for proc in reversed(procs):
+            proc.terminate()
+            proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end load benchmark for /query.")
+    parser.add_argument("--url", help="Drive an already-running backend instead of starting one.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--compact", action="store_true", help="Request coalesced /query frames.")
+    parser.add_argument("--gzip", action="store_true", help="Request a gzipped event stream.")
+    parser.add_argument("--fixture", type=Path, help="Reuse (or create) a fixture at this path.")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--indexed", type=int, default=2000)
+    parser.add_argument("--pdfs", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes.")
+    parser.add_argument("--sidecar", action="store_true", help="Serve search and SQL from one retrieval sidecar.")
+    parser.add_argument("--env", action="append", default=[], help="Extra backend env var, e.g. --env MAX_ACTIVE_REQUESTS=4")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here as well as to stdout.")
+    add_script_arguments(parser)
+    args = parser.parse_args()
+
+    if args.url:
+        report = asyncio.run(drive(args.url, args.concurrency, args.requests, args.compact, args.gzip))
+    else:
+        report = run_stack(args)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.write_text(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Local OpenAI-compatible stand-in for OpenRouter, plus an S3 stand-in for PDFs.
+
+Chat completions are streamed with scripted behaviour so a full /query run is
+reproducible offline:
+
+- planner turns fan out to FANOUT research_agent calls, then synthesize
+- base agent turns walk through search_cases, sql, bash and read_pdf calls
+  against the fixture, then answer
+
+Token timings (time to first token, inter-token delay) are configurable so
+runs see realistic streaming. S3 objects are served path-style from the
+fixture's s3/ directory at /s3/BUCKET/KEY.
+
+    python -m benchmarks.mock_openrouter /tmp/themis-fixture --port 8100
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+import uuid
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
+
+from benchmarks.fixtures import load_manifest
+
+ANSWER_WORDS = (
+    "Based on the retrieved judgments the court has generally granted relief where the petitioner "
+    "showed no prior record and the recovered quantity was below the commercial threshold, citing "
+    "the cases found above and the reasoning of the bench in each."
+).split()
+
+# Arguments are streamed in chunks of this many characters
+ARGUMENT_CHUNK = 24
+
+
+class Script:
+    def __init__(self, manifest: dict, ttft: float, token_delay: float, agent_steps: int, fanout: int, answer_tokens: int):
+        self.manifest = manifest
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.agent_steps = agent_steps
+        self.fanout = fanout
+        self.answer_tokens = answer_tokens
+        self._partitions = itertools.cycle(manifest["partitions"])
+        self._pdf_keys = itertools.cycle(manifest["pdf_keys"] or [""])
+        self._subjects = itertools.cycle(manifest["subjects"])
+
+    def plan(self, messages: list[dict]) -> tuple[list[dict], int]:
+        """Return (tool calls, answer token count) for the next turn."""
+        system = _text(messages[0])
+        tool_results = sum(1 for m in messages if m["role"] == "tool")
+
+        if "research planner" in system:
+            if tool_results:
+                return [], self.answer_tokens
+            return [
+                {"name": "research_agent", "arguments": {"instructions": f"Find cases about {next(self._subjects)}."}}
+                for _ in range(self.fanout)
+            ], 0
+
+        # The budget's final turn asks for an answer with no more tools
+        if tool_results >= self.agent_steps or "budget is nearly exhausted" in _text(messages[-1]):
+            return [], self.answer_tokens
+        return [self._agent_tool_call(tool_results)], 0
+
+    def _agent_tool_call(self, step: int) -> dict:
+        data_dir = self.manifest["data_dir"]
+        partition = next(self._partitions)
+        calls = [
+            {"name": "search_cases", "arguments": {"query": next(self._subjects), "n_results": 10}},
+            {
+                "name": "sql",
+                "arguments": {
+                    "query": (
+                        f"SELECT title, judge, disposal_nature FROM read_json_auto('{data_dir}/json/{partition}/*.json') "
+                        "LIMIT 20"
+                    )
+                },
+            },
+            {"name": "bash", "arguments": {"command": f"grep -l Bail {data_dir}/json/{partition}/ -r"}},
+            {"name": "read_pdf", "arguments": {"s3_key": next(self._pdf_keys)}},
+        ]
+        return calls[step % len(calls)]
+
+
+def _text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content)
+    return content
+
+
+def _chunk(completion_id: str, model: str, delta: dict, finish_reason: str | None = None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def create_app(script: Script) -> FastAPI:
+    app = FastAPI()
+    s3_dir = Path(script.manifest["s3_dir"])
+
+    @app.post("/api/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "mock")
+        messages = body["messages"]
+        tool_calls, answer_tokens = script.plan(messages)
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+        prompt_tokens = len(json.dumps(messages)) // 4
+        cached_tokens = len(_text(messages[0])) // 4 if isinstance(messages[0].get("content"), list) else 0
+
+        async def stream():
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            await asyncio.sleep(script.ttft)
+            yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+
+            output_tokens = 0
+            for i in range(answer_tokens):
+                word = ANSWER_WORDS[i % len(ANSWER_WORDS)]
+                yield _chunk(completion_id, model, {"content": word + " "})
+                output_tokens += 1
+                await asyncio.sleep(script.token_delay)
+
+            for index, call in enumerate(tool_calls):
+                arguments = json.dumps(call["arguments"])
+                yield _chunk(completion_id, model, {"tool_calls": [{
+                    "index": index,
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": call["name"], "arguments": ""},
+                }]})
+                for start in range(0, len(arguments), ARGUMENT_CHUNK):
+                    piece = arguments[start : start + ARGUMENT_CHUNK]
+                    yield _chunk(completion_id, model, {"tool_calls": [{"index": index, "function": {"arguments": piece}}]})
+                    output_tokens += 1
+                    await asyncio.sleep(script.token_delay)
+
+            yield _chunk(completion_id, model, {}, "tool_calls" if tool_calls else "stop")
+
+            if include_usage:
+                usage = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": output_tokens,
+                        "total_tokens": prompt_tokens + output_tokens,
+                        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+                    },
+                }
+                yield f"data: {json.dumps(usage)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.api_route("/s3/{bucket}/{key:path}", methods=["GET", "HEAD"])
+    async def s3_object(bucket: str, key: str):
+        path = (s3_dir / bucket / key).resolve()
+        if not path.is_relative_to(s3_dir.resolve()) or not path.is_file():
+            raise HTTPException(status_code=404, detail="NoSuchKey")
+        return FileResponse(path, media_type="application/pdf")
+
+    return app
+
+
+def add_script_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--ttft-ms", type=float, default=400, help="Delay before the first streamed chunk.")
+    parser.add_argument("--token-ms", type=float, default=15, help="Delay between streamed chunks.")
+    parser.add_argument("--agent-steps", type=int, default=3, help="Tool calls each base agent makes before answering.")
+    parser.add_argument("--fanout", type=int, default=3, help="research_agent calls per planner run.")
+    parser.add_argument("--answer-tokens", type=int, default=120, help="Tokens in each final answer.")
+
+
+def script_from_args(manifest: dict, args: argparse.Namespace) -> Script:
+    return Script(
+        manifest,
+        ttft=args.ttft_ms / 1000,
+        token_delay=args.token_ms / 1000,
+        agent_steps=args.agent_steps,
+        fanout=args.fanout,
+        answer_tokens=args.answer_tokens,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenRouter and S3 server for offline benchmarks.")
+    parser.add_argument("fixture", type=Path, help="Fixture directory written by benchmarks.fixtures")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_script_arguments(parser)
+    args = parser.parse_args()
+
+    app = create_app(script_from_args(load_manifest(args.fixture), args))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
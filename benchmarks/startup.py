@@ -0,0 +1,154 @@
+"""Backend startup benchmark with pass/fail targets.
+
+Measures, each in a fresh interpreter:
+
+- import time of backend.main, with the slowest modules from -X importtime
+- that none of the heavy tool dependencies are imported at module load
+- time from launching uvicorn to /health/live, and to /health/ready once the
+  background warm-up (LLM client, DuckDB, Chroma index, boto3, PyMuPDF) is done
+
+    python -m benchmarks.startup --output startup_report.json
+
+Exits non-zero when a target is missed, so it can gate CI.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fixtures import generate
+from benchmarks.load import ROOT, backend_env, free_port, peak_rss_mb
+
+# Targets for a warm disk cache; the first run after install is slower
+IMPORT_TARGET_SECONDS = 1.0
+LIVE_TARGET_SECONDS = 2.0
+
+# Must only load on first use or during warm-up
+LAZY_MODULES = ["chromadb", "duckdb", "boto3", "fitz", "langfuse", "openai"]
+
+CHECK_LAZY = (
+    "import json, sys, time\n"
+    "started_at = time.perf_counter()\n"
+    "import backend.main\n"
+    "print(json.dumps({'seconds': time.perf_counter() - started_at, 'loaded': [m for m in %r if m in sys.modules]}))\n"
+)
+
+
+def profile_imports(env: dict[str, str], top: int) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHECK_LAZY % (LAZY_MODULES,)],
+        env=env,
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    # Lines look like "import time:  self [us] | cumulative | <indent>package"
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.append((name.strip(), int(cumulative) / 1e6, len(name) - len(name.lstrip())))
+    # Only modules imported directly by the backend or its direct dependencies
+    shallow = [m for m in modules if m[2] <= 3]
+    slowest = sorted(shallow, key=lambda m: m[1], reverse=True)[:top]
+
+    return {
+        "seconds": round(result["seconds"], 3),
+        "heavy_modules_loaded": result["loaded"],
+        "slowest": [{"module": name, "cumulative_seconds": round(seconds, 3)} for name, seconds, _ in slowest],
+    }
+
+
+def time_server(env: dict[str, str], timeout: float) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    started_at = time.monotonic()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        cwd=ROOT,
+    )
+    result = {"live_seconds": None, "ready_seconds": None, "tools": None}
+    try:
+        with httpx.Client(timeout=1) as client:
+            while time.monotonic() - started_at < timeout:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"backend exited with {proc.returncode}")
+                try:
+                    if result["live_seconds"] is None:
+                        client.get(f"{url}/health/live").raise_for_status()
+                        result["live_seconds"] = round(time.monotonic() - started_at, 3)
+                    response = client.get(f"{url}/health/ready")
+                    if response.status_code == 200:
+                        result["ready_seconds"] = round(time.monotonic() - started_at, 3)
+                        result["tools"] = response.json()["tools"]
+                        break
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.05)
+        result["peak_rss_mb"] = peak_rss_mb(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend import and startup time against targets.")
+    parser.add_argument("--fixture", type=Path, help="Reuse (or create) a fixture at this path.")
+    parser.add_argument("--runs", type=int, default=3, help="Server starts to time; the median is checked.")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list.")
+    parser.add_argument("--import-target", type=float, default=IMPORT_TARGET_SECONDS)
+    parser.add_argument("--live-target", type=float, default=LIVE_TARGET_SECONDS)
+    parser.add_argument("--timeout", type=float, default=300, help="Give up waiting for readiness after this long.")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here as well as to stdout.")
+    args = parser.parse_args()
+
+    fixture = args.fixture or Path(tempfile.mkdtemp(prefix="themis-bench-"))
+    if not (fixture / "manifest.json").exists():
+        print(f"Generating fixture in {fixture} ...", file=sys.stderr)
+        generate(fixture, files=200, indexed=200, pdfs=2)
+    manifest = json.loads((fixture / "manifest.json").read_text())
+    # Nothing is fetched during startup, so no mock server is needed
+    env = backend_env(manifest, "http://127.0.0.1:9", {"SESSION_DB_PATH": str(fixture / "sessions.db")})
+
+    imports = profile_imports(env, args.top)
+    runs = [time_server(env, args.timeout) for _ in range(args.runs)]
+    live = sorted(r["live_seconds"] for r in runs if r["live_seconds"] is not None)
+    median_live = live[len(live) // 2] if live else None
+
+    failures = []
+    if imports["seconds"] > args.import_target:
+        failures.append(f"import took {imports['seconds']}s, target {args.import_target}s")
+    if imports["heavy_modules_loaded"]:
+        failures.append(f"imported at startup: {', '.join(imports['heavy_modules_loaded'])}")
+    if median_live is None or median_live > args.live_target:
+        failures.append(f"/health/live took {median_live}s, target {args.live_target}s")
+    if any(r["ready_seconds"] is None for r in runs):
+        failures.append(f"/health/ready not reached within {args.timeout}s")
+
+    report = {
+        "targets": {"import_seconds": args.import_target, "live_seconds": args.live_target},
+        "imports": imports,
+        "server": {"median_live_seconds": median_live, "runs": runs},
+        "failures": failures,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.write_text(text + "\n")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
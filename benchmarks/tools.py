@@ -0,0 +1,243 @@
+"""Per-tool microbenchmarks over synthetic corpora of increasing size.
+
+For each scale a fixture is generated (and reused on later runs) in the
+production year=/court=/bench= layout. Each tool then runs a representative
+query mix in its own subprocess, so peak RSS is attributable to that tool
+alone:
+
+    python -m benchmarks.tools --scales 10000 100000 400000 --output tool_report.json
+
+The report lists, per scale and tool, latency percentiles for every query in
+the mix, the number of files each query scans, success rate and peak RSS, so
+runs from different commits can be diffed directly.
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import resource
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.fixtures import generate, load_manifest
+from benchmarks.load import ROOT, backend_env, free_port, summarize
+
+TOOLS = ["sql", "search_cases", "bash", "read_pdf"]
+
+
+def sql_cases(manifest: dict) -> list[dict]:
+    data = f"{manifest['data_dir']}/json"
+    partition = manifest["partitions"][0]
+    year, court, bench = (part.split("=", 1)[1] for part in partition.split("/"))
+    return [
+        {
+            "name": "partition_scan",
+            "glob": f"{data}/{partition}/*.json",
+            "parameters": {
+                "query": (
+                    f"SELECT disposal_nature, count(*) FROM read_json_auto('{data}/{partition}/*.json') "
+                    "GROUP BY disposal_nature"
+                )
+            },
+        },
+        {
+            "name": "court_year_filter",
+            "glob": f"{data}/year={year}/court={court}/*/*.json",
+            "parameters": {
+                "query": (
+                    f"SELECT title, judge FROM read_json_auto('{data}/year={year}/court={court}/*/*.json') "
+                    "WHERE disposal_nature = 'Bail Granted' LIMIT 20"
+                )
+            },
+        },
+        {
+            "name": "cross_year_aggregate",
+            "glob": f"{data}/year=*/court={court}/bench={bench}/*.json",
+            "parameters": {
+                "query": (
+                    f"SELECT year, count(*) FROM read_json_auto('{data}/year=*/court={court}/bench={bench}/*.json') "
+                    "GROUP BY year ORDER BY year"
+                )
+            },
+        },
+    ]
+
+
+def search_cases(manifest: dict) -> list[dict]:
+    return [
+        {"name": f"semantic_top{k}", "parameters": {"query": subject, "n_results": k}, "files": manifest["indexed"]}
+        for k in (10, 30)
+        for subject in manifest["subjects"][:3]
+    ]
+
+
+def bash_cases(manifest: dict) -> list[dict]:
+    data = f"{manifest['data_dir']}/json"
+    partition = manifest["partitions"][0]
+    year = partition.split("/")[0]
+    return [
+        {"name": "grep_partition", "glob": f"{data}/{partition}/*.json", "parameters": {"command": f"grep -rl petitioner {data}/{partition}"}},
+        {"name": "grep_year", "glob": f"{data}/{year}/*/*/*.json", "parameters": {"command": f"grep -rl petitioner {data}/{year}"}},
+        {"name": "count_year", "glob": f"{data}/{year}/*/*/*.json", "parameters": {"command": f'find {data}/{year} -name "*.json" | wc -l'}},
+    ]
+
+
+def pdf_cases(manifest: dict) -> list[dict]:
+    return [{"name": "download_extract", "parameters": {"s3_key": key}, "files": 1} for key in manifest["pdf_keys"]]
+
+
+QUERY_MIXES = {"sql": sql_cases, "search_cases": search_cases, "bash": bash_cases, "read_pdf": pdf_cases}
+
+
+def _start_s3_server(manifest: dict, port: int) -> None:
+    import uvicorn
+
+    from benchmarks.mock_openrouter import Script, create_app
+
+    app = create_app(Script(manifest, ttft=0, token_delay=0, agent_steps=0, fanout=0, answer_tokens=0))
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+
+async def _run_worker(tool_name: str, manifest: dict, repeat: int) -> dict:
+    # Imported here so the environment set by the parent is in place first
+    from backend.tools.base import ToolRequest
+    from backend.tools.bash import BashTool
+    from backend.tools.chromadb_tool import ChromaDBTool
+    from backend.tools.duckdb_tool import DuckDBTool
+    from backend.tools.pdf_tool import PDFTool
+
+    tool = {"sql": DuckDBTool, "search_cases": ChromaDBTool, "bash": BashTool, "read_pdf": PDFTool}[tool_name]()
+    cases = QUERY_MIXES[tool_name](manifest)
+
+    # Warm-up pays for imports and, for search, the Chroma index build. Outside
+    # any tool timeout, so a large index is timed rather than cut off.
+    started_at = time.monotonic()
+    tool.warm_up()
+    warm_up_seconds = time.monotonic() - started_at
+
+    # The first call still opens connections; it must work or every number below is noise
+    started_at = time.monotonic()
+    response = await tool.execute(ToolRequest(parameters=cases[0]["parameters"]))
+    setup_seconds = time.monotonic() - started_at
+    if not response.success:
+        raise RuntimeError(f"{tool_name} setup call failed: {response.error}")
+
+    by_name: dict[str, dict] = {}
+    for case in cases:
+        entry = by_name.setdefault(case["name"], {"latencies": [], "ok": 0, "runs": 0, "files_scanned": 0})
+        if "glob" in case:
+            entry["files_scanned"] = len(glob.glob(case["glob"]))
+        else:
+            entry["files_scanned"] = case["files"]
+        for _ in range(repeat):
+            started_at = time.monotonic()
+            response = await tool.execute(ToolRequest(parameters=case["parameters"]))
+            entry["latencies"].append(time.monotonic() - started_at)
+            entry["runs"] += 1
+            entry["ok"] += int(response.success)
+            if not response.success:
+                entry["last_error"] = (response.error or "")[:200]
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "tool": tool_name,
+        "warm_up_seconds": round(warm_up_seconds, 4),
+        "setup_seconds": round(setup_seconds, 4),
+        "peak_rss_mb": round(peak_rss / scale, 1),
+        "queries": {
+            name: {
+                "files_scanned": entry["files_scanned"],
+                "success_rate": entry["ok"] / entry["runs"],
+                "latency_seconds": summarize(entry["latencies"]),
+                **({"last_error": entry["last_error"]} if "last_error" in entry else {}),
+            }
+            for name, entry in by_name.items()
+        },
+    }
+
+
+def worker_main(tool_name: str, fixture: Path, repeat: int, s3_port: int) -> None:
+    manifest = load_manifest(fixture)
+    if tool_name == "read_pdf":
+        _start_s3_server(manifest, s3_port)
+    result = asyncio.run(_run_worker(tool_name, manifest, repeat))
+    print(json.dumps(result))
+
+
+def run_tool(tool_name: str, fixture: Path, manifest: dict, repeat: int) -> dict:
+    s3_port = free_port()
+    env = backend_env(manifest, f"http://127.0.0.1:{s3_port}", {})
+    proc = subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.tools", "--worker", tool_name, "--fixture", str(fixture),
+            "--repeat", str(repeat), "--s3-port", str(s3_port),
+        ],
+        env=env,
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        return {"tool": tool_name, "error": proc.stderr.strip().splitlines()[-1:] or ["worker failed"]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-tool microbenchmarks over scalable synthetic datasets.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10000, 100000, 400000], help="Corpus sizes in files.")
+    parser.add_argument("--tools", nargs="+", choices=TOOLS, default=TOOLS)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query in each mix.")
+    parser.add_argument(
+        "--max-indexed",
+        type=int,
+        help="Cap on cases indexed into Chroma per scale. By default every file is indexed; capped scales are flagged.",
+    )
+    parser.add_argument("--workdir", type=Path, default=Path("/tmp/themis-tool-bench"), help="Fixtures are cached here.")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here as well as to stdout.")
+    parser.add_argument("--worker", choices=TOOLS, help=argparse.SUPPRESS)
+    parser.add_argument("--fixture", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--s3-port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker_main(args.worker, args.fixture, args.repeat, args.s3_port)
+        return
+
+    report = {"repeat": args.repeat, "scales": []}
+    for files in args.scales:
+        fixture = args.workdir / f"scale-{files}"
+        if not (fixture / "manifest.json").exists():
+            print(f"Generating {files} files in {fixture} ...", file=sys.stderr)
+            started_at = time.monotonic()
+            indexed = files if args.max_indexed is None else min(files, args.max_indexed)
+            generate(fixture, files=files, indexed=indexed, pdfs=10)
+            print(f"  done in {time.monotonic() - started_at:.1f}s", file=sys.stderr)
+        manifest = load_manifest(fixture)
+
+        results = {}
+        for tool_name in args.tools:
+            print(f"Benchmarking {tool_name} at {files} files ...", file=sys.stderr)
+            results[tool_name] = run_tool(tool_name, fixture, manifest, args.repeat)
+        # search_cases latency at a capped scale reflects the index size, not the corpus size
+        capped = manifest["indexed"] < files
+        if capped:
+            print(f"  search_cases at {files} files only covers {manifest['indexed']} indexed cases", file=sys.stderr)
+        report["scales"].append({"files": files, "indexed": manifest["indexed"], "index_capped": capped, "tools": results})
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.write_text(text + "\n")
+
+
+if __name__ == "__main__":
+    main()